@@ -0,0 +1,124 @@
+import collections
+import os
+import threading
+import uuid
+import weakref
+import numpy as np
+from audio_io import SPOOL_DIR
+
+# Total RAM that session arrays may use before the least recently used spill to disk
+SESSION_MEMORY_BYTES = int(os.environ.get("LAB_SESSION_MEMORY_BYTES", 1024**3))
+
+
+# Function to tell whether an array's data already lives in a file on disk
+def _is_file_backed(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base if isinstance(array, np.ndarray) else None
+    return False
+
+
+class ArrayStore:
+    """Arrays of all sessions, kept in RAM within a global budget.
+
+    When the resident arrays exceed max_bytes, the least recently used
+    ones are written to .npy files and dropped from memory. Asking for a
+    spilled array maps its file read-only, so it is paged in as it is
+    read. A spilled array that a caller (such as a running job) still
+    references keeps counting against the budget until it is released.
+    Arrays that are already memory-mapped, such as cached uploads, cost
+    no RAM budget and are never spilled.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def resident_bytes(self):
+        """Bytes of stored arrays held in RAM, by the store or by its callers."""
+        return sum(entry["nbytes"] for entry in self._entries.values() if _in_memory(entry))
+
+    def put(self, owner, name, array):
+        """Stores array under (owner, name), replacing any previous one."""
+        with self._lock:
+            self._remove((owner, name))
+            if array is None:
+                return
+            nbytes = 0 if _is_file_backed(array) else array.nbytes
+            self._entries[(owner, name)] = {"array": array, "path": None, "nbytes": nbytes, "released": None}
+            self._spill(keep=(owner, name))
+
+    def get(self, owner, name):
+        """Returns the array stored under (owner, name), or None."""
+        with self._lock:
+            entry = self._entries.get((owner, name))
+            if entry is None:
+                return None
+            self._entries.move_to_end((owner, name))
+            if entry["array"] is None:
+                # Map the spilled array rather than reading it back in
+                entry["array"] = np.load(entry["path"], mmap_mode="r")
+            return entry["array"]
+
+    def drop_owner(self, owner):
+        """Forgets every array of one owner (e.g. a closed session)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner]:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry["path"] is not None:
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+
+    def _spill(self, keep):
+        for key, entry in self._entries.items():
+            if self.resident_bytes <= self.max_bytes:
+                break
+            if key == keep or entry["path"] is not None or entry["nbytes"] == 0:
+                continue
+            # Arrays are never modified in place, so one copy on disk is enough
+            os.makedirs(self.directory, exist_ok=True)
+            entry["path"] = os.path.join(self.directory, f"{uuid.uuid4().hex}.npy")
+            np.save(entry["path"], entry["array"])
+            # Callers may still hold the in-memory array; it counts until they let go
+            entry["released"] = weakref.ref(entry["array"])
+            entry["array"] = None
+
+
+# Function to tell whether a stored entry still occupies RAM
+def _in_memory(entry):
+    if entry["path"] is None:
+        return True
+    return entry["released"]() is not None
+
+
+class SessionArrays:
+    """One session's view of an ArrayStore.
+
+    Keep an instance in st.session_state; when the session ends and the
+    instance is garbage collected, the session's arrays and spill files
+    are released.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._owner = uuid.uuid4().hex
+        weakref.finalize(self, store.drop_owner, self._owner)
+
+    def get(self, name):
+        return self._store.get(self._owner, name)
+
+    def put(self, name, array):
+        self._store.put(self._owner, name, array)
+
+
+# Store shared by every session of this server process
+session_store = ArrayStore(os.path.join(SPOOL_DIR, "sessions"), SESSION_MEMORY_BYTES)
@@ -0,0 +1,57 @@
+import functools
+import glob
+import hashlib
+import os
+import shutil
+
+# Folder served by Streamlit at app/static/ (server.enableStaticServing)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Subfolder holding the content-hashed copies of the assets
+HASHED_DIR = os.path.join(STATIC_DIR, "hashed")
+
+# URL prefix of Streamlit's static file serving
+STATIC_URL = "app/static"
+
+
+# Function to return a cache-friendly URL for an image or other asset
+def asset_url(path):
+    """Returns the static URL of a content-hashed copy of path, or None.
+
+    The file is only read and hashed when its modification time or size
+    changes; otherwise the URL is answered from memory. Because the URL
+    contains the content hash, browsers can cache it indefinitely and the
+    page only carries the short URL instead of the file's bytes. None is
+    returned if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _publish(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+# Function to copy one version of an asset under its content hash
+@functools.lru_cache(maxsize=64)
+def _publish(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as asset_file:
+        for chunk in iter(lambda: asset_file.read(65536), b""):
+            digest.update(chunk)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    name = f"{stem}.{digest.hexdigest()[:12]}{ext}"
+    hashed_path = os.path.join(HASHED_DIR, name)
+    if not os.path.exists(hashed_path):
+        os.makedirs(HASHED_DIR, exist_ok=True)
+        # Copy to a temporary name first so no request sees a partial file
+        temp_path = f"{hashed_path}.{os.getpid()}.tmp"
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, hashed_path)
+        # Earlier versions of the same asset are no longer referenced
+        for old_path in glob.glob(os.path.join(HASHED_DIR, f"{glob.escape(stem)}.{'[0-9a-f]' * 12}{ext}")):
+            if old_path != hashed_path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+    return f"{STATIC_URL}/hashed/{name}"
@@ -0,0 +1,256 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import wave
+import weakref
+import numpy as np
+import scipy.io.wavfile as wav
+import scipy.signal as signal
+from disk_cache import DiskCache
+from dsp import BLOCK_SIZE, stft_power, stft_shape
+
+# Directory used to spool uploads and hold decoded audio on local disk
+SPOOL_DIR = os.environ.get("LAB_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "signals_lab"))
+
+# Decoded audio shared by all sessions, keyed by the upload's content hash
+AUDIO_CACHE_BYTES = int(os.environ.get("LAB_AUDIO_CACHE_BYTES", 2 * 1024**3))
+audio_cache = DiskCache(os.path.join(SPOOL_DIR, "audio"), AUDIO_CACHE_BYTES)
+
+# Spectrogram frames shared by all sessions, keyed by content, window and hop
+FRAME_CACHE_BYTES = int(os.environ.get("LAB_FRAME_CACHE_BYTES", 512 * 1024**2))
+frame_cache = DiskCache(os.path.join(SPOOL_DIR, "frames"), FRAME_CACHE_BYTES)
+
+# Filtered audio, spectra and encoded playback shared by all sessions, keyed by
+# the content hash of the audio and the settings they were computed with
+RESULT_CACHE_BYTES = int(os.environ.get("LAB_RESULT_CACHE_BYTES", 2 * 1024**3))
+result_cache = DiskCache(os.path.join(SPOOL_DIR, "results"), RESULT_CACHE_BYTES)
+
+# Sample rate used for reduced-rate playback previews
+PREVIEW_RATE = 16000
+
+# Modules whose code determines the cached results; test_page.py chooses
+# the settings and render arguments of the figures it caches
+RESULT_SOURCES = ["dsp.py", "plots.py", "audio_io.py", "test_page.py"]
+
+# Arrays currently mapped by this process, so sessions share one object
+_open_arrays = weakref.WeakValueDictionary()
+_open_lock = threading.Lock()
+
+
+# Function to fingerprint the code that computes cached results
+def code_version(sources=RESULT_SOURCES):
+    """Returns a short hash of the given source files next to this module.
+
+    Cache keys include it, so results computed by an earlier deploy are
+    never served; they age out of the caches by LRU eviction.
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sources:
+        with open(os.path.join(directory, name), "rb") as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()[:12]
+
+
+# Version of the result code running in this process
+CODE_VERSION = code_version()
+
+
+# Function to hash the contents of a file-like object
+def content_hash(file_obj):
+    """Returns the SHA-256 hex digest of a file-like object's contents."""
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(BLOCK_SIZE), b""):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+# Function to copy an uploaded file to disk without reading it into memory
+def spool_upload(uploaded_file):
+    """Writes a file-like upload to the spool directory and returns its path."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".wav", dir=SPOOL_DIR)
+    os.close(fd)
+    uploaded_file.seek(0)
+    with open(path, "wb") as out_file:
+        shutil.copyfileobj(uploaded_file, out_file, BLOCK_SIZE)
+    return path
+
+
+# Function to open a WAV file, memory-mapped where the format allows it
+def read_wav(path):
+    """Returns (sample_rate, samples) with samples memory-mapped if possible."""
+    try:
+        return wav.read(path, mmap=True)
+    except ValueError:
+        # Formats such as 24-bit PCM cannot be memory-mapped by scipy
+        return wav.read(path)
+
+
+# Function to convert one block of samples, keeping its channels
+def _keep_channels(block, dtype, out=None):
+    if out is None:
+        return block
+    out[...] = block
+    return out
+
+
+# Function to downmix one block of samples to mono
+def _downmix(block, dtype, out=None):
+    if block.ndim > 1:
+        return np.mean(block, axis=1, dtype=dtype, out=out)
+    return _keep_channels(block, dtype, out)
+
+
+# Function to decode a WAV file into a normalized .npy file
+def decode_wav(path, out_path, dtype=np.float32, downmix=False, block_size=BLOCK_SIZE):
+    """Peak-normalizes a WAV file block by block.
+
+    The result is written to out_path as a .npy file of the given float
+    dtype and the sample rate is returned. Mono files give a 1-D array and
+    multichannel files a (samples, channels) array, normalized by their
+    common peak so the balance between channels is kept; downmix=True
+    averages the channels to mono instead. Each block is copied straight
+    into the output file and scaled in place, so no full-length copy of
+    the recording is ever held in memory.
+    """
+    sample_rate, raw = read_wav(path)
+    n = len(raw)
+    convert = _downmix if downmix else _keep_channels
+    shape = (n,) if downmix else raw.shape
+
+    # First pass: peak of the signal (max/min avoid abs() overflow)
+    peak = 0.0
+    for start in range(0, n, block_size):
+        block = convert(raw[start:start + block_size], dtype)
+        if block.size:
+            peak = max(peak, float(block.max()), -float(block.min()))
+    scale = np.dtype(dtype).type(1.0 / peak if peak > 0 else 1.0)
+
+    # Second pass: convert into the output and normalize in place
+    audio = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=shape)
+    for start in range(0, n, block_size):
+        out = convert(raw[start:start + block_size], dtype, out=audio[start:start + block_size])
+        out *= scale
+    audio.flush()
+    return sample_rate
+
+
+# Function to open a cached .npy file as a shared read-only memory map
+def open_audio(path):
+    """Returns the read-only memory-mapped array stored at path.
+
+    Every session asking for the same file gets the same array object.
+    """
+    with _open_lock:
+        audio = _open_arrays.get(path)
+        if audio is None:
+            audio = np.load(path, mmap_mode="r")
+            _open_arrays[path] = audio
+        return audio
+
+
+# Function to decode a Streamlit upload through the shared audio cache
+def ingest_upload(uploaded_file, dtype=np.float32, downmix=False):
+    """Returns (content hash, sample_rate, memory-mapped audio) for an upload.
+
+    Uploads are identified by a hash of their bytes. A cache hit maps the
+    existing .npy file; a miss spools the upload to disk once, decodes it
+    into the cache and then maps it. Each dtype and channel layout is
+    cached separately.
+    """
+    key = content_hash(uploaded_file)
+    layout = "mono" if downmix else "multi"
+    prefix = f"{key}_{np.dtype(dtype).name}_{layout}_"
+    path = audio_cache.find(prefix)
+    if path is None:
+        wav_path = spool_upload(uploaded_file)
+        temp_path = audio_cache.temp_path(".npy")
+        try:
+            sample_rate = decode_wav(wav_path, temp_path, dtype, downmix)
+            path = audio_cache.add(temp_path, f"{prefix}{sample_rate}.npy")
+        except Exception:
+            os.remove(temp_path)
+            raise
+        finally:
+            os.remove(wav_path)
+    sample_rate = int(os.path.basename(path)[len(prefix):-len(".npy")])
+    return key, sample_rate, open_audio(path)
+
+
+# Function to share a computed file between sessions through a disk cache
+def cached_result(cache, name, write):
+    """Returns the path of the file cached under name.
+
+    On a miss, write(temp_path) is called to create the file, which is
+    then published atomically, so concurrent sessions never see a partial
+    result. The extension of name is kept on the temporary path.
+    """
+    path = cache.get(name)
+    if path is None:
+        temp_path = cache.temp_path(os.path.splitext(name)[1])
+        try:
+            write(temp_path)
+            path = cache.add(temp_path, name)
+        except Exception:
+            os.remove(temp_path)
+            raise
+    return path
+
+
+# Function to compute spectrogram frames once and share them through the frame cache
+def stft_frames(key, x, sample_rate, max_freq, nperseg, hop, progress=None):
+    """Returns the memory-mapped stft_power() frames of x.
+
+    key identifies the content of x (for example its content hash); frames
+    are cached on disk per (key, window, hop, band) and CODE_VERSION, so
+    rendering another time range or re-rendering only reads the frames it
+    needs.
+    """
+    def write(path):
+        shape = stft_shape(len(x), sample_rate, max_freq, nperseg, hop)
+        frames = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+        stft_power(x, sample_rate, max_freq, nperseg, hop, out=frames, progress=progress)
+        frames.flush()
+
+    return open_audio(cached_result(frame_cache, f"{key}_{nperseg}_{hop}_{int(max_freq)}_{CODE_VERSION}.npy", write))
+
+
+# Function to write audio as a 16-bit PCM WAV stream
+def write_wav(file_obj, audio, sample_rate, block_size=BLOCK_SIZE):
+    """Writes float audio in [-1, 1] to a path or binary file object.
+
+    Samples are clipped and converted to int16 one block at a time and
+    written straight into the WAV stream, without a full-length int16 copy.
+    audio is 1-D or (samples, channels), written as interleaved frames.
+    """
+    with wave.open(file_obj, "wb") as wav_file:
+        wav_file.setnchannels(audio.shape[1] if audio.ndim > 1 else 1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(int(sample_rate))
+        for start in range(0, len(audio), block_size):
+            block = np.clip(audio[start:start + block_size], -1.0, 1.0) * 32767
+            wav_file.writeframes(block.astype("<i2").tobytes())
+
+
+# Function to encode audio as 16-bit PCM WAV bytes
+def encode_wav(audio, sample_rate, block_size=BLOCK_SIZE):
+    """Returns WAV file bytes for float audio in [-1, 1]."""
+    buffer = io.BytesIO()
+    write_wav(buffer, audio, sample_rate, block_size)
+    return buffer.getvalue()
+
+
+# Function to encode a reduced-rate preview of long audio for playback
+def encode_preview(audio, sample_rate, preview_rate=PREVIEW_RATE):
+    """Returns (WAV bytes, rate), resampled to preview_rate if that is lower."""
+    if sample_rate <= preview_rate:
+        return encode_wav(audio, sample_rate), sample_rate
+    divisor = np.gcd(int(sample_rate), int(preview_rate))
+    preview = signal.resample_poly(audio, preview_rate // divisor, int(sample_rate) // divisor)
+    return encode_wav(preview, preview_rate), preview_rate
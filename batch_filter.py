@@ -0,0 +1,132 @@
+"""Apply one filter to every WAV file in a directory, outside the web app.
+
+Example:
+    python batch_filter.py recordings/ filtered/ --type band --cutoff 500 --cutoff 1500
+
+For each input file this writes the filtered audio as <name>.wav and a
+<name>.spectrum.csv with the averaged spectra of the original and filtered
+audio up to --max-freq (one column per channel). Files are processed in parallel on a process pool.
+"""
+import argparse
+import concurrent.futures
+import glob
+import os
+import sys
+import time
+import numpy as np
+from audio_io import decode_wav, open_audio, write_wav
+from dsp import BTYPES, FILTER_FAMILIES, FILTER_ORDER, FIR_TAPS, MAX_FIR_TAPS, averaged_spectrum, design_filter, filter_blocks
+
+# Command-line filter type names mapped to the labels used by the app
+FILTER_TYPES = {btype: label for label, btype in BTYPES.items()}
+FAMILIES = {method: label for label, method in FILTER_FAMILIES.items()}
+
+
+# Function to filter one WAV file and write its outputs
+def process_file(path, out_dir, filter_type, order, cutoffs, zero_phase, max_freq, family="Butterworth (IIR)"):
+    """Filters one file; returns (path, duration in seconds, input bytes)."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    decoded_path = os.path.join(out_dir, f".{name}.{os.getpid()}.npy")
+    filtered_path = os.path.join(out_dir, f".{name}.{os.getpid()}.filtered.npy")
+    try:
+        sample_rate = decode_wav(path, decoded_path)
+        audio = open_audio(decoded_path)
+        coefficients = design_filter(filter_type, order, tuple(cutoffs), sample_rate, family)
+        # Filtered straight into a file, so memory does not grow with the recording
+        filtered = np.lib.format.open_memmap(filtered_path, mode="w+", dtype=audio.dtype, shape=audio.shape)
+        filter_blocks(coefficients, audio, zero_phase=zero_phase, out=filtered)
+        write_wav(os.path.join(out_dir, f"{name}.wav"), filtered, sample_rate)
+
+        # Spectrum summary of the original and filtered audio
+        band = min(max_freq, 0.5 * sample_rate)
+        freq_hz, psd_original = averaged_spectrum(audio, sample_rate, band)
+        _, psd_filtered = averaged_spectrum(filtered, sample_rate, band)
+        if psd_original.ndim > 1:
+            channels = [f"_ch{channel + 1}" for channel in range(psd_original.shape[1])]
+        else:
+            channels = [""]
+        header = ",".join(
+            ["frequency_hz"]
+            + [f"original_psd{channel}" for channel in channels]
+            + [f"filtered_psd{channel}" for channel in channels]
+        )
+        np.savetxt(
+            os.path.join(out_dir, f"{name}.spectrum.csv"),
+            np.column_stack([freq_hz, psd_original, psd_filtered]),
+            delimiter=",",
+            header=header,
+            comments="",
+        )
+        duration = len(audio) / sample_rate
+        del audio, filtered
+    finally:
+        for temp_path in (decoded_path, filtered_path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return path, duration, os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a filter to a directory of WAV files.")
+    parser.add_argument("input_dir", help="directory containing .wav files")
+    parser.add_argument("output_dir", help="directory for filtered .wav and .spectrum.csv files")
+    parser.add_argument("--type", choices=sorted(FILTER_TYPES), default="low", help="filter type (default: low)")
+    parser.add_argument("--cutoff", type=float, action="append", required=True,
+                        help="cutoff frequency in Hz; give it twice (low, high) for a band-pass filter")
+    parser.add_argument("--family", choices=sorted(FAMILIES), default="butter",
+                        help="butter (IIR), firwin (windowed FIR) or firls (least-squares FIR) (default: butter)")
+    parser.add_argument("--order", type=int,
+                        help=f"filter order, or number of taps for FIR filters (default: {FILTER_ORDER} or {FIR_TAPS})")
+    parser.add_argument("--causal", action="store_true", help="single causal pass instead of zero-phase filtering")
+    parser.add_argument("--max-freq", type=float, default=5000, help="upper frequency of the spectrum summary in Hz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    filter_type = FILTER_TYPES[args.type]
+    family = FAMILIES[args.family]
+    if args.order is None:
+        args.order = FILTER_ORDER if args.family == "butter" else FIR_TAPS
+    if args.family in MAX_FIR_TAPS and (args.order | 1) > MAX_FIR_TAPS[args.family]:
+        parser.error(f"{args.family} filters are limited to {MAX_FIR_TAPS[args.family]} taps")
+    if len(args.cutoff) != (2 if args.type == "band" else 1):
+        parser.error("band-pass filters need two --cutoff values, other types exactly one")
+
+    if os.path.abspath(args.output_dir) == os.path.abspath(args.input_dir):
+        parser.error("output_dir must differ from input_dir")
+
+    paths = sorted(glob.glob(os.path.join(args.input_dir, "*.wav")))
+    if not paths:
+        parser.error(f"no .wav files found in {args.input_dir}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    total_seconds = total_bytes = failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(process_file, path, args.output_dir, filter_type, args.order,
+                            args.cutoff, not args.causal, args.max_freq, family): path
+            for path in paths
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                path, duration, size = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"{futures[future]}: error: {e}", file=sys.stderr)
+                continue
+            total_seconds += duration
+            total_bytes += size
+            print(f"{os.path.basename(path)}: {duration:.1f} s of audio")
+    elapsed = time.perf_counter() - start
+
+    done = len(paths) - failures
+    print(
+        f"Processed {done} file(s), {total_seconds:.1f} s of audio in {elapsed:.2f} s: "
+        f"{done / elapsed:.2f} files/s, {total_seconds / elapsed:.1f}x real time, "
+        f"{total_bytes / elapsed / 1e6:.1f} MB/s"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
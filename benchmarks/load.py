@@ -0,0 +1,291 @@
+"""Load-test the Streamlit pages with many simultaneous sessions.
+
+Run from the repository root:
+
+    python -m benchmarks.load                          # 8 users, 3 rounds each
+    python -m benchmarks.load --users 30 --rounds 5
+    python -m benchmarks.load --durations 1,10,60,300 --cold
+    python -m benchmarks.load --save load.json
+
+Every simulated user is a thread driving its own session of test_page.py
+through Streamlit's app-testing API (streamlit.testing.v1.AppTest), so all
+sessions share one process, job pool and set of caches, as they would on a
+single server worker. AppTest installs a process-wide mock runtime for
+each run, so script reruns take turns; the filtering and plotting jobs
+they start still overlap on the shared job pool, and time spent waiting
+for a turn is counted in the rerun's latency like queueing on a busy
+server.
+
+Each user opens homepg.py, then for every round uploads a synthetic WAV
+of one of the --durations, changes the filter type and family, applies
+the filter and plots the response, waiting for each background job to
+deliver its result. By default every user uploads the
+same few files, as a classroom does; --cold makes each upload unique so
+the shared caches cannot help. The caches live in a temporary spool
+directory (LAB_SPOOL_DIR) of this run, so a live server on the same host
+keeps its cached uploads and results.
+
+Reported are latency percentiles of each kind of rerun ("done" actions
+measure the click until the job's result is on the page), throughput,
+and the process's resident memory before, at its peak and after the run.
+Page errors (st.error) are listed as warnings; exceptions fail the run.
+No server, browser or external service is needed.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+# Point the lab's caches at a directory of this run before audio_io is first
+# imported (by benchmarks.pipeline or the pages), so a run never evicts the
+# entries of a live server
+_spool = tempfile.TemporaryDirectory(prefix="signals_lab_load_")
+os.environ["LAB_SPOOL_DIR"] = _spool.name
+
+from benchmarks.pipeline import peak_rss, write_synthetic_wav  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAB_PAGE = os.path.join(ROOT, "test_page.py")
+HOME_PAGE = os.path.join(ROOT, "homepg.py")
+
+# Uploads: durations in seconds, at one sample rate and channel count
+DURATIONS = [1, 10, 60]
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+# Settings each user picks from at random
+FILTER_TYPES = ["Low-Pass", "High-Pass", "Band-Pass"]
+FILTER_FAMILIES = ["Butterworth (IIR)", "Windowed FIR"]
+
+# Longest a single rerun or background job may take before the user gives up
+TIMEOUT = 300
+
+# Interval between checks of a running job, like the page's progress fragment
+POLL_SECONDS = 0.05
+
+# AppTest.run swaps a global Runtime instance, so only one run may be active
+_run_lock = threading.Lock()
+
+
+# Function to read this process's current resident memory in bytes
+def current_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss()
+
+
+# Function to make an upload's bytes unique without changing how it sounds
+def unique_upload(data, rng):
+    """Returns a copy of WAV bytes with the last sample's low byte randomized."""
+    data = bytearray(data)
+    data[-2] = rng.randrange(256)
+    return bytes(data)
+
+
+class User:
+    """One simulated visitor, timing every rerun of their session."""
+
+    def __init__(self, index, uploads, rounds, cold, seed):
+        self.index = index
+        self.uploads = uploads
+        self.rounds = rounds
+        self.cold = cold
+        self.rng = random.Random(seed * 1000 + index)
+        self.timings = []
+        self.errors = []
+        self.warnings = set()
+        self.at = None
+
+    def run(self):
+        try:
+            home = AppTest.from_file(HOME_PAGE, default_timeout=TIMEOUT)
+            self._rerun("home", home.run)
+            self._check(home)
+            self.at = AppTest.from_file(LAB_PAGE, default_timeout=TIMEOUT)
+            self._rerun("open", self.at.run)
+            for round_index in range(self.rounds):
+                self.play_round(round_index)
+        except Exception:
+            self.errors.append(traceback.format_exc(limit=3))
+
+    def play_round(self, round_index):
+        at = self.at
+        name, data = self.uploads[(self.index + round_index) % len(self.uploads)]
+        if self.cold:
+            data = unique_upload(data, self.rng)
+        at.file_uploader[0].set_value((f"{name}.wav", data, "audio/wav"))
+        self._rerun("upload", at.run)
+
+        self._select("Select Filter Type", self.rng.choice(FILTER_TYPES))
+        self._select("Filter Family", self.rng.choice(FILTER_FAMILIES))
+
+        self._click("Apply Filter", "filter_job", "filter")
+        self._click("Plot Response", "plot_job", "plot")
+        self._check(at)
+
+    def _select(self, label, value):
+        widget = _find(self.at.selectbox, label)
+        if widget.value != value:
+            widget.set_value(value)
+            self._rerun("settings", self.at.run)
+
+    def _click(self, label, job_name, action):
+        at = self.at
+        start = time.perf_counter()
+        _find(at.button, label).click()
+        self._rerun(action, at.run)
+        # Rerun as the progress fragment does until the job's result is shown
+        job = at.session_state[job_name]
+        while job is not None:
+            if time.perf_counter() - start > TIMEOUT:
+                raise TimeoutError(f"{action} did not finish within {TIMEOUT} s")
+            if job.done():
+                self._rerun("result", at.run)
+                break
+            time.sleep(POLL_SECONDS)
+            job = at.session_state[job_name]
+        self.timings.append((f"{action} done", time.perf_counter() - start))
+
+    def _rerun(self, action, run):
+        start = time.perf_counter()
+        with _run_lock:
+            run()
+        self.timings.append((action, time.perf_counter() - start))
+
+    def _check(self, at):
+        for element in at.exception:
+            self.errors.append(f"user {self.index}: {element.value}")
+        for element in at.error:
+            self.warnings.add(element.value)
+
+
+# Function to find a widget on the page by its label
+def _find(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no {label!r} widget on the page")
+
+
+# Function to summarize latencies of each kind of rerun
+def latency_table(users):
+    """Returns {action: stats} with count, p50, p90, p99 and max in seconds."""
+    by_action = {}
+    for user in users:
+        for action, seconds in user.timings:
+            by_action.setdefault(action, []).append(seconds)
+    table = {}
+    for action, samples in by_action.items():
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        table[action] = {"count": len(samples), "p50": p50, "p90": p90, "p99": p99, "max": max(samples)}
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the lab pages with concurrent simulated users.")
+    parser.add_argument("--users", type=int, default=8, help="simultaneous sessions (default 8)")
+    parser.add_argument("--rounds", type=int, default=3, help="upload/filter/plot rounds per user (default 3)")
+    parser.add_argument(
+        "--durations",
+        default=",".join(map(str, DURATIONS)),
+        help="comma-separated upload durations in seconds (default %(default)s)",
+    )
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which users join (default 0)")
+    parser.add_argument("--cold", action="store_true", help="make every upload unique so shared caches miss")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the users' choices")
+    parser.add_argument("--save", metavar="PATH", help="write the report to a JSON file")
+    args = parser.parse_args(argv)
+
+    durations = [float(d) for d in args.durations.split(",")]
+    with tempfile.TemporaryDirectory() as work_dir:
+        uploads = []
+        for duration in durations:
+            path = os.path.join(work_dir, "upload.wav")
+            write_synthetic_wav(path, duration, SAMPLE_RATE, CHANNELS)
+            with open(path, "rb") as f:
+                uploads.append((f"{duration:g}s", f.read()))
+            os.remove(path)
+
+    users = [User(i, uploads, args.rounds, args.cold, args.seed) for i in range(args.users)]
+    threads = [threading.Thread(target=user.run, name=f"user-{user.index}") for user in users]
+
+    gc.collect()
+    rss_start = current_rss()
+    peak_rss(reset=True)
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        if args.ramp and i < len(threads) - 1:
+            time.sleep(args.ramp / (len(threads) - 1))
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    rss_peak = peak_rss()
+    # Memory still held once every session has gone away
+    for user in users:
+        user.at = None
+    gc.collect()
+    rss_end = current_rss()
+
+    table = latency_table(users)
+    reruns = sum(stats["count"] for action, stats in table.items() if not action.endswith(" done"))
+    completed = sum(stats["count"] for action, stats in table.items() if action.endswith(" done"))
+    errors = [error for user in users for error in user.errors]
+    warnings = sorted(set().union(*(user.warnings for user in users)))
+
+    print(f"{args.users} users x {args.rounds} rounds, uploads {', '.join(name for name, _ in uploads)}"
+          f"{' (cold)' if args.cold else ''}")
+    print(f"{'action':<14}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action in sorted(table):
+        stats = table[action]
+        print(
+            f"{action:<14}{stats['count']:>7}{stats['p50'] * 1e3:>10.0f}{stats['p90'] * 1e3:>10.0f}"
+            f"{stats['p99'] * 1e3:>10.0f}{stats['max'] * 1e3:>10.0f}"
+        )
+    print(f"wall time {elapsed:.1f} s, {reruns / elapsed:.2f} reruns/s, {completed / elapsed:.2f} jobs/s")
+    print(
+        f"RSS start {rss_start / 1e6:.0f} MB, peak {rss_peak / 1e6:.0f} MB, end {rss_end / 1e6:.0f} MB "
+        f"(+{(rss_peak - rss_start) / 1e6 / max(args.users, 1):.1f} MB per user at peak, "
+        f"{(rss_end - rss_start) / 1e6:+.0f} MB retained)"
+    )
+    for warning in warnings:
+        print(f"WARNING {warning}")
+    for error in errors:
+        print(f"ERROR {error}")
+
+    if args.save:
+        report = {
+            "users": args.users,
+            "rounds": args.rounds,
+            "durations": durations,
+            "cold": args.cold,
+            "seconds": elapsed,
+            "reruns_per_second": reruns / elapsed,
+            "jobs_per_second": completed / elapsed,
+            "rss_start_bytes": rss_start,
+            "rss_peak_bytes": rss_peak,
+            "rss_end_bytes": rss_end,
+            "latency": table,
+            "warnings": warnings,
+            "errors": errors,
+        }
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
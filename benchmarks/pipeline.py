@@ -0,0 +1,200 @@
+"""Benchmark each stage of the audio filtering pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline                      # quick matrix
+    python -m benchmarks.pipeline --full               # up to 1 h recordings
+    python -m benchmarks.pipeline --save baseline.json
+    python -m benchmarks.pipeline --compare baseline.json
+
+Stages mirror the lab page: ingest (WAV read, downmix and normalize),
+design, filter, spectrum, render and encode. Every case is a synthetic
+int16 WAV (chirp plus noise) at the requested duration, rate and channel
+count, plus the bundled "audio2 (2).wav". For each stage the wall time
+(best of --repeat runs), the peak RSS and the bytes/blocks allocated
+through Python and NumPy (via tracemalloc) are reported.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+import numpy as np
+from audio_io import decode_wav, encode_wav, open_audio
+from dsp import FILTER_ORDER, design_filter, filter_blocks, filter_response, magnitude_spectrum
+from plots import render_response
+
+BUNDLED_WAV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio2 (2).wav")
+
+# Case matrix: durations in seconds, sample rates in Hz, channel counts
+QUICK_DURATIONS = [1, 10, 60]
+FULL_DURATIONS = [1, 10, 60, 600, 3600]
+SAMPLE_RATES = [8000, 44100, 96000]
+CHANNELS = [1, 2]
+
+# Filter used by every case
+FILTER_TYPE = "Band-Pass"
+CUTOFFS = (500, 1500)
+
+
+# Function to write a synthetic int16 WAV file without holding it in memory
+def write_synthetic_wav(path, duration, sample_rate, channels, block_size=1 << 18):
+    rng = np.random.default_rng(0)
+    n = int(duration * sample_rate)
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for start in range(0, n, block_size):
+            t = np.arange(start, min(start + block_size, n)) / sample_rate
+            # Linear chirp from 50 Hz to 0.4 * sample_rate over the file
+            sweep = 0.4 * sample_rate - 50
+            phase = 2 * np.pi * (50 * t + 0.5 * sweep * t ** 2 / max(duration, 1e-9))
+            block = 0.5 * np.sin(phase)[:, None] + 0.1 * rng.standard_normal((len(t), channels))
+            wav_file.writeframes((block * 32767).astype("<i2").tobytes())
+
+
+# Function to read this process's peak RSS in bytes, resetting it if possible
+def peak_rss(reset=False):
+    try:
+        if reset:
+            # Linux: writing 5 to clear_refs resets the VmHWM high-water mark
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Fallback: lifetime peak (kilobytes on Linux, bytes on macOS)
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+# Function to measure one stage
+def measure(fn, repeat):
+    """Returns (result, stats) for the zero-argument callable fn."""
+    gc.collect()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        del result
+        gc.collect()
+
+    # Separate traced run, so tracemalloc overhead does not skew the timing
+    peak_rss(reset=True)
+    tracemalloc.start()
+    result = fn()
+    snapshot = tracemalloc.take_snapshot()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = {
+        "seconds": best,
+        "peak_rss_bytes": peak_rss(),
+        "peak_alloc_bytes": traced_peak,
+        "alloc_blocks": sum(stat.count for stat in snapshot.statistics("filename")),
+    }
+    return result, stats
+
+
+# Function to run every stage of the pipeline on one WAV file
+def run_case(wav_path, work_dir, repeat):
+    npy_path = os.path.join(work_dir, "decoded.npy")
+    results = {}
+
+    sample_rate, results["ingest"] = measure(lambda: decode_wav(wav_path, npy_path), repeat)
+    audio = open_audio(npy_path)
+    params = (FILTER_TYPE, FILTER_ORDER, CUTOFFS, sample_rate)
+
+    def design():
+        design_filter.cache_clear()
+        filter_response.cache_clear()
+        return design_filter(*params), filter_response(*params)
+
+    (sos, (filter_freq_hz, h)), results["design"] = measure(design, repeat)
+    filtered, results["filter"] = measure(lambda: filter_blocks(sos, audio), repeat)
+
+    max_freq = min(5000, 0.5 * sample_rate)
+
+    def spectra():
+        return magnitude_spectrum(audio, sample_rate, max_freq), magnitude_spectrum(filtered, sample_rate, max_freq)
+
+    ((freq_hz, original), (_, filtered_spectrum)), results["spectrum"] = measure(spectra, repeat)
+    _, results["render"] = measure(
+        lambda: render_response(filter_freq_hz, h, freq_hz, original, filtered_spectrum, max_freq), repeat
+    )
+    _, results["encode"] = measure(lambda: encode_wav(filtered, sample_rate), repeat)
+
+    del audio, filtered
+    os.remove(npy_path)
+    return results
+
+
+# Function to compare results against a saved baseline
+def compare(results, baseline, tolerance):
+    """Prints regressions and returns how many were found."""
+    regressions = 0
+    for case, stages in results.items():
+        for stage, stats in stages.items():
+            base = baseline.get(case, {}).get(stage)
+            if base is None:
+                continue
+            for metric in ("seconds", "peak_alloc_bytes"):
+                if base[metric] > 0 and stats[metric] > base[metric] * (1 + tolerance):
+                    regressions += 1
+                    print(f"REGRESSION {case} {stage} {metric}: {base[metric]:.4g} -> {stats[metric]:.4g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio filtering pipeline stage by stage.")
+    parser.add_argument("--full", action="store_true", help="include 10 min and 1 h recordings")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--save", metavar="PATH", help="write results to a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    args = parser.parse_args(argv)
+
+    durations = FULL_DURATIONS if args.full else QUICK_DURATIONS
+    results = {}
+    print(f"{'case':<28}{'stage':<10}{'time (s)':>10}{'peak RSS MB':>13}{'alloc MB':>10}{'blocks':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        cases = [(os.path.basename(BUNDLED_WAV), BUNDLED_WAV)]
+        for duration, rate, channels in itertools.product(durations, SAMPLE_RATES, CHANNELS):
+            cases.append((f"{duration}s-{rate}Hz-{channels}ch", (duration, rate, channels)))
+
+        for name, source in cases:
+            if isinstance(source, tuple):
+                wav_path = os.path.join(work_dir, "case.wav")
+                write_synthetic_wav(wav_path, *source)
+            else:
+                wav_path = source
+            results[name] = run_case(wav_path, work_dir, args.repeat)
+            for stage, stats in results[name].items():
+                print(
+                    f"{name:<28}{stage:<10}{stats['seconds']:>10.4f}{stats['peak_rss_bytes'] / 1e6:>13.1f}"
+                    f"{stats['peak_alloc_bytes'] / 1e6:>10.1f}{stats['alloc_blocks']:>9}"
+                )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Check that the float32 pipeline matches the float64 pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks.precision [WAV ...]
+
+Every file (by default the bundled "audio2 (2).wav" and a synthetic
+chirp) is decoded, filtered with each of the app's filter types, analysed
+(single FFT and Welch PSD) and encoded in both precisions. The worst differences are printed, and
+the exit status is non-zero if any exceeds its tolerance.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+from audio_io import decode_wav, encode_wav
+from benchmarks.pipeline import BUNDLED_WAV, write_synthetic_wav
+from dsp import FILTER_ORDER, averaged_spectrum, design_filter, filter_blocks, magnitude_spectrum
+
+# Filters checked on every file
+FILTERS = [("Low-Pass", (1000,)), ("High-Pass", (1000,)), ("Band-Pass", (500, 1500))]
+
+# Largest acceptable float32 error relative to full scale (filtered audio),
+# in dB (magnitude and Welch PSD bins within 60 dB of the peak) and in int16
+# steps (encoding)
+AUDIO_TOLERANCE = 1e-5
+SPECTRUM_TOLERANCE_DB = 0.01
+ENCODE_TOLERANCE = 1
+
+
+# Function to run the pipeline in one precision
+def run_pipeline(wav_path, npy_path, dtype, filter_type, cutoffs):
+    sample_rate = decode_wav(wav_path, npy_path, dtype)
+    audio = np.load(npy_path)
+    sos = design_filter(filter_type, FILTER_ORDER, cutoffs, sample_rate)
+    filtered = filter_blocks(sos, audio)
+    _, spectrum = magnitude_spectrum(filtered, sample_rate, min(5000, 0.5 * sample_rate))
+    _, psd = averaged_spectrum(filtered, sample_rate, min(5000, 0.5 * sample_rate))
+    encoded = np.frombuffer(encode_wav(filtered, sample_rate)[44:], dtype="<i2")
+    return filtered, (spectrum, np.sqrt(psd)), encoded
+
+
+# Function to compare the two precisions on one file
+def check_file(wav_path, work_dir):
+    """Returns the worst (audio, spectrum dB, encode) errors over all filters."""
+    npy_path = os.path.join(work_dir, "decoded.npy")
+    worst = [0.0, 0.0, 0]
+    for filter_type, cutoffs in FILTERS:
+        filtered32, spectra32, encoded32 = run_pipeline(wav_path, npy_path, np.float32, filter_type, cutoffs)
+        filtered64, spectra64, encoded64 = run_pipeline(wav_path, npy_path, np.float64, filter_type, cutoffs)
+        assert filtered32.dtype == np.float32 and all(spectrum.dtype == np.float32 for spectrum in spectra32)
+
+        # Both spectra are compared as magnitudes (the PSD by its square root)
+        spectrum_db = 0.0
+        for spectrum32, spectrum64 in zip(spectra32, spectra64):
+            significant = spectrum64 > spectrum64.max() * 1e-3
+            spectrum_db = max(spectrum_db, np.max(np.abs(20 * np.log10(spectrum32[significant] / spectrum64[significant]))))
+        errors = [
+            float(np.max(np.abs(filtered32 - filtered64))),
+            float(spectrum_db),
+            int(np.max(np.abs(encoded32.astype(int) - encoded64))),
+        ]
+        worst = [max(a, b) for a, b in zip(worst, errors)]
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare float32 and float64 pipeline results.")
+    parser.add_argument("wav", nargs="*", help="WAV files to check (default: bundled and synthetic audio)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = args.wav
+        if not paths:
+            synthetic = os.path.join(work_dir, "synthetic.wav")
+            write_synthetic_wav(synthetic, 30, 44100, 2)
+            paths = [BUNDLED_WAV, synthetic]
+        for path in paths:
+            audio_error, spectrum_error, encode_error = check_file(path, work_dir)
+            ok = (
+                audio_error <= AUDIO_TOLERANCE
+                and spectrum_error <= SPECTRUM_TOLERANCE_DB
+                and encode_error <= ENCODE_TOLERANCE
+            )
+            failures += not ok
+            print(
+                f"{'ok  ' if ok else 'FAIL'} {os.path.basename(path)}: audio {audio_error:.2e}, "
+                f"spectrum {spectrum_error:.2e} dB, encoded {encode_error} LSB"
+            )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
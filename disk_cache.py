@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+
+
+class DiskCache:
+    """A directory of cache files bounded in total size.
+
+    Files are published atomically with os.replace, so several sessions or
+    processes can share one directory. When the directory grows beyond
+    max_bytes, the least recently used files (by modification time, which
+    is refreshed on every hit) are removed first.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def find(self, prefix):
+        """Returns the path of a cached file whose name starts with prefix."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            if name.startswith(prefix) and not name.startswith("tmp"):
+                path = os.path.join(self.directory, name)
+                if self._touch(path):
+                    return path
+        return None
+
+    def get(self, name):
+        """Returns the path of a cached file, or None on a miss."""
+        path = os.path.join(self.directory, name)
+        return path if self._touch(path) else None
+
+    def temp_path(self, suffix=""):
+        """Returns a fresh path inside the cache directory for writing."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="tmp", suffix=suffix, dir=self.directory)
+        os.close(fd)
+        return path
+
+    def add(self, temp_path, name):
+        """Publishes a file written to temp_path under name and evicts."""
+        path = os.path.join(self.directory, name)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Removes least recently used files until the size budget is met."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.startswith("tmp"):
+                    # Being written by another session
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still open elsewhere (e.g. memory-mapped on Windows)
+                    continue
+                total -= size
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,611 @@
+import functools
+import numpy as np
+import scipy.fft as sp_fft
+import scipy.signal as signal
+
+# Butterworth order used by the lab page
+FILTER_ORDER = 6
+
+# Default length of the linear-phase FIR filters (odd, so the delay is a whole number of samples)
+FIR_TAPS = 1025
+
+# Filter type labels shown in the app mapped to scipy band types
+BTYPES = {
+    "Low-Pass": "low",
+    "High-Pass": "high",
+    "Band-Pass": "band",
+}
+
+# Filter family labels shown in the app mapped to the design method
+FILTER_FAMILIES = {
+    "Butterworth (IIR)": "butter",
+    "Windowed FIR": "firwin",
+    "Least-squares FIR": "firls",
+}
+
+# Longest FIR filter accepted per design method; firls solves a dense system
+# whose memory grows with the square of the length (about 100 MB at 4097 taps)
+MAX_FIR_TAPS = {
+    "firwin": 32769,
+    "firls": 4097,
+}
+
+
+# Function to design a filter as second-order sections or FIR taps
+@functools.lru_cache(maxsize=128)
+def design_filter(filter_type, order, cutoffs, sample_rate, family="Butterworth (IIR)"):
+    """Returns the coefficients for the given filter settings.
+
+    Designs are memoized per (filter type, order, cutoffs, sample rate,
+    family), so repeated clicks and other sessions reuse the same
+    coefficients. Cutoffs are given in Hz as a tuple: one value for
+    low/high-pass, two for band-pass. Butterworth designs are returned as
+    a 2-D SOS array; FIR designs as 1-D linear-phase taps, with order
+    taken as the number of taps (rounded up to an odd number) and limited
+    to MAX_FIR_TAPS for the family; longer filters raise ValueError.
+    The returned array is shared between callers and must not be modified.
+    """
+    method = FILTER_FAMILIES[family]
+    if method == "butter":
+        nyquist = 0.5 * sample_rate
+        normal_cutoff = [c / nyquist for c in cutoffs]
+        if len(normal_cutoff) == 1:
+            normal_cutoff = normal_cutoff[0]
+        return signal.butter(order, normal_cutoff, btype=BTYPES[filter_type], analog=False, output="sos")
+
+    numtaps = order | 1
+    if numtaps > MAX_FIR_TAPS[method]:
+        raise ValueError(f"{family} filters are limited to {MAX_FIR_TAPS[method]} taps")
+    btype = BTYPES[filter_type]
+    if method == "firwin":
+        pass_zero = {"low": "lowpass", "high": "highpass", "band": "bandpass"}[btype]
+        return signal.firwin(numtaps, list(cutoffs), pass_zero=pass_zero, fs=sample_rate)
+    bands, desired = _firls_bands(btype, cutoffs, 0.5 * sample_rate, 4.0 * sample_rate / numtaps)
+    return signal.firls(numtaps, bands, desired, fs=sample_rate)
+
+
+# Function to lay out the pass and stop bands of a least-squares FIR design
+def _firls_bands(btype, cutoffs, nyquist, width):
+    """Returns (band edges, desired gains) with a transition band of width Hz
+    centred on each cutoff, narrowed where the bands would overlap."""
+    gaps = [2 * c for c in cutoffs] + [2 * (nyquist - c) for c in cutoffs]
+    if len(cutoffs) == 2:
+        gaps.append(cutoffs[1] - cutoffs[0])
+    half = 0.5 * min([width] + gaps) * 0.99
+    edges = [0.0]
+    for c in cutoffs:
+        edges += [c - half, c + half]
+    edges.append(nyquist)
+    gains = {"low": [1, 1, 0, 0], "high": [0, 0, 1, 1], "band": [0, 0, 1, 1, 0, 0]}[btype]
+    return edges, gains
+
+
+# Function to compute the frequency response of a designed filter
+@functools.lru_cache(maxsize=128)
+def filter_response(filter_type, order, cutoffs, sample_rate, family="Butterworth (IIR)", worN=2000):
+    """Returns (frequencies in Hz, complex response) for a cached design."""
+    coefficients = design_filter(filter_type, order, cutoffs, sample_rate, family)
+    if coefficients.ndim == 1:
+        return signal.freqz(coefficients, worN=worN, fs=sample_rate)
+    freq_hz, h = signal.sosfreqz(coefficients, worN=worN, fs=sample_rate)
+    return freq_hz, h
+
+
+# Number of samples processed per block by the streaming filter
+BLOCK_SIZE = 65536
+
+
+# Coefficients of a second-order section that passes the signal unchanged
+PASS_THROUGH = np.array([1.0, 0.0, 0.0, 1.0, 0.0, 0.0])
+
+
+# Function to compute the edge padding used by forward-backward filtering
+def _padlen(sos, n_samples):
+    """Matches the default odd-extension length of scipy's sosfiltfilt."""
+    # Pass-through sections added by stack_sos() do not count
+    sos = sos[~np.all(sos == PASS_THROUGH, axis=1)]
+    n_trivial = min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    padlen = 3 * (2 * len(sos) + 1 - n_trivial)
+    return min(padlen, n_samples - 1)
+
+
+# Function to stack several SOS designs into one coefficient array
+def stack_sos(sos_list):
+    """Returns an (n_filters, n_sections, 6) array of SOS coefficients.
+
+    Designs with fewer sections are padded with pass-through sections, so
+    filters of different types and orders share one array.
+    """
+    n_sections = max(len(sos) for sos in sos_list)
+    stacked = np.tile(PASS_THROUGH, (len(sos_list), n_sections, 1))
+    for i, sos in enumerate(sos_list):
+        stacked[i, :len(sos)] = sos
+    return stacked
+
+
+# Function to allocate the output of a block-wise filter, or check the one given
+def _output_array(out, shape, dtype):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    return out
+
+
+# Function to filter a signal block by block with bounded temporary memory
+def filter_blocks(sos, x, zero_phase=True, block_size=BLOCK_SIZE, progress=None, dtype=None, out=None):
+    """Filters x with SOS coefficients in fixed-size blocks.
+
+    The filter state is carried between blocks with sosfilt, so the result
+    does not depend on the block size. With zero_phase=False this is a
+    single causal pass; with zero_phase=True it is a forward-backward pass
+    equivalent to scipy's sosfiltfilt (odd extension at both edges). Apart
+    from the returned array, memory use is bounded by the block size, and
+    x may be a memory-mapped array that is never loaded as a whole. x is
+    either 1-D or (samples, channels); all channels are filtered in one
+    call along the time axis.
+
+    sos may also be a stacked (n_filters, n_sections, 6) array from
+    stack_sos(). Every filter is then applied during the same pass over
+    x, each block being read once, and the result gets a leading axis
+    with one output per filter.
+
+    sos may also be 1-D FIR taps from design_filter(); they are applied by
+    FFT convolution in convolve_blocks() instead.
+
+    If given, progress(fraction) is called after every block; it may raise
+    to abandon the work between blocks.
+
+    The output has the given dtype, by default that of a floating-point x
+    (float64 otherwise). Filter states are always carried in float64, so
+    a float32 output only rounds the stored samples. The result can also
+    be written into out, for example a memory-mapped .npy file from
+    np.lib.format.open_memmap, so that not even the output is held in
+    memory; out must have the shape of the result and sets its dtype.
+    """
+    if sos.ndim == 1:
+        return convolve_blocks(sos, x, zero_phase, progress=progress, dtype=dtype, out=out)
+    if dtype is None:
+        dtype = x.dtype if np.issubdtype(x.dtype, np.floating) else np.float64
+    stacked = sos.ndim == 3
+    sos_stack = sos if stacked else sos[np.newaxis]
+    n = len(x)
+    if stacked:
+        y = _output_array(out, (len(sos_stack),) + x.shape, dtype)
+    else:
+        y = _output_array(out, x.shape, dtype)[np.newaxis]
+
+    # Initial state per filter and section, broadcast over any channel axis
+    zi = [signal.sosfilt_zi(s).reshape((len(s), 2) + (1,) * (x.ndim - 1)) for s in sos_stack]
+
+    if not zero_phase:
+        states = [z * x[0] for z in zi]
+        for start in range(0, n, block_size):
+            block = np.asarray(x[start:start + block_size])
+            for i, s in enumerate(sos_stack):
+                y[i, start:start + block_size], states[i] = signal.sosfilt(s, block, axis=0, zi=states[i])
+            if progress is not None:
+                progress(min(start + block_size, n) / n)
+        return y if stacked else y[0]
+
+    # Odd extensions of the signal edges, as in sosfiltfilt
+    padlens = [_padlen(s, n) for s in sos_stack]
+    states = []
+    for s, z, padlen in zip(sos_stack, zi, padlens):
+        head = 2 * x[0] - x[padlen:0:-1]
+        _, state = signal.sosfilt(s, head, axis=0, zi=z * head[0])
+        states.append(state)
+
+    # Forward pass over the signal itself
+    for start in range(0, n, block_size):
+        block = np.asarray(x[start:start + block_size])
+        for i, s in enumerate(sos_stack):
+            y[i, start:start + block_size], states[i] = signal.sosfilt(s, block, axis=0, zi=states[i])
+        if progress is not None:
+            progress(min(start + block_size, n) / (2 * n))
+
+    # Through the tail and back again, which sets up the backward pass
+    for i, (s, z, padlen) in enumerate(zip(sos_stack, zi, padlens)):
+        tail = 2 * x[-1] - x[-2:-padlen - 2:-1]
+        tail_y, _ = signal.sosfilt(s, tail, axis=0, zi=states[i])
+        _, states[i] = signal.sosfilt(s, tail_y[::-1], axis=0, zi=z * tail_y[-1])
+
+    # Backward pass over the forward output, from the end
+    for stop in range(n, 0, -block_size):
+        start = max(stop - block_size, 0)
+        for i, s in enumerate(sos_stack):
+            block, states[i] = signal.sosfilt(s, y[i, start:stop][::-1], axis=0, zi=states[i])
+            y[i, start:stop] = block[::-1]
+        if progress is not None:
+            progress((2 * n - start) / (2 * n))
+    return y if stacked else y[0]
+
+
+# Largest FFT considered for overlap-add convolution
+MAX_CONVOLUTION_FFT = 1 << 20
+
+
+# Function to choose the FFT length of overlap-add convolution
+@functools.lru_cache(maxsize=128)
+def convolution_fft_size(numtaps, max_size=MAX_CONVOLUTION_FFT):
+    """Returns the power-of-two FFT length with the least work per output sample.
+
+    Each FFT of length n yields n - numtaps + 1 new output samples for
+    roughly n * log2(n) operations, so short FFTs waste work on the
+    overlap and very long ones on the log factor.
+    """
+    size = 1 << int(np.ceil(np.log2(2 * numtaps)))
+    best_size, best_cost = size, np.inf
+    while size <= max_size:
+        cost = size * np.log2(size) / (size - numtaps + 1)
+        if cost < best_cost:
+            best_size, best_cost = size, cost
+        size *= 2
+    return best_size
+
+
+# Function to apply FIR taps to a signal by block-wise FFT convolution
+def convolve_blocks(taps, x, zero_phase=True, fft_size=None, progress=None, dtype=None, out=None):
+    """Filters x with FIR taps by overlap-add, one FFT block at a time.
+
+    The cost is O(N log M) for N samples and M taps, against O(N M) for
+    direct convolution, and the block length is chosen by
+    convolution_fft_size() unless fft_size is given. Linear-phase taps
+    delay the signal by (M - 1) / 2 samples; with zero_phase=True that
+    delay is removed, giving a zero-phase result in a single pass. With
+    zero_phase=False the result is the causal filter output. As in
+    filter_blocks, x may be memory-mapped and 1-D or (samples, channels),
+    progress(fraction) is called after every block, the output has x's
+    floating-point dtype unless dtype is given, and it may be written
+    into out.
+    """
+    if dtype is None:
+        dtype = x.dtype if np.issubdtype(x.dtype, np.floating) else np.float64
+    numtaps = len(taps)
+    n_fft = fft_size or convolution_fft_size(numtaps)
+    step = n_fft - numtaps + 1
+    delay = (numtaps - 1) // 2 if zero_phase else 0
+    n = len(x)
+    y = _output_array(out, x.shape, dtype)
+    taps_fft = sp_fft.rfft(taps, n_fft).reshape((-1,) + (1,) * (x.ndim - 1))
+
+    # Output sample k of the full convolution lands at y[k - delay]
+    def emit(values, k):
+        lo = max(k - delay, 0)
+        hi = min(k - delay + len(values), n)
+        if hi > lo:
+            y[lo:hi] = values[lo - (k - delay):hi - (k - delay)]
+
+    overlap = np.zeros((numtaps - 1,) + x.shape[1:])
+    for start in range(0, n, step):
+        block = np.asarray(x[start:start + step], dtype=np.float64)
+        segment = sp_fft.irfft(sp_fft.rfft(block, n_fft, axis=0) * taps_fft, n_fft, axis=0)
+        segment = segment[:len(block) + numtaps - 1]
+        segment[:numtaps - 1] += overlap
+        emit(segment[:len(block)], start)
+        overlap = segment[len(block):]
+        if progress is not None:
+            progress(min(start + step, n) / n)
+
+    # The tail of the last block completes the output
+    emit(overlap, n)
+    return y
+
+
+# Bands per octave of the equalizer filter banks
+BAND_FRACTIONS = {
+    "Octave": 1,
+    "Third-octave": 3,
+}
+
+# Function to design the crossovers of an octave or fractional-octave bank
+@functools.lru_cache(maxsize=32)
+def design_filter_bank(fraction, sample_rate, lowest=25.0):
+    """Returns (band centres in Hz, crossovers) for a 1/fraction-octave bank.
+
+    Centres are spaced 2 ** (1 / fraction) apart around 1 kHz (base-2
+    nominal frequencies) from lowest up to the last band whose upper edge
+    stays below 90% of the Nyquist frequency. Neighbouring bands are split
+    at the geometric midpoint between their centres by a 4th-order
+    Linkwitz-Riley crossover, and the crossovers form a tree, so the
+    lowest band reaches down to 0 Hz and the highest up to Nyquist.
+
+    crossovers has shape (n_bands - 1, 3, 2, 6): the low-pass, high-pass
+    and all-pass SOS of each crossover, from the lowest up (the all-pass
+    padded with a pass-through section). The low- and high-pass halves
+    of a crossover add up to its all-pass, so with every gain at one the
+    bank only shifts the phase and leaves the magnitude unchanged (see
+    equalize_blocks). The arrays are shared between callers and must not
+    be modified.
+    """
+    half_band = 2.0 ** (1 / (2 * fraction))
+    centres = []
+    k = int(np.ceil(fraction * np.log2(lowest / 1000)))
+    while 1000 * 2.0 ** (k / fraction) * half_band < 0.45 * sample_rate:
+        centres.append(1000 * 2.0 ** (k / fraction))
+        k += 1
+    crossovers = []
+    for c in centres[:-1]:
+        low = design_filter("Low-Pass", 2, (c * half_band,), sample_rate)
+        high = design_filter("High-Pass", 2, (c * half_band,), sample_rate)
+        # Both halves share the poles; the all-pass mirrors them in its zeros
+        all_pass = np.concatenate([low[0, 3:][::-1], low[0, 3:]])[np.newaxis]
+        crossovers.append(stack_sos([np.vstack([low, low]), np.vstack([high, high]), all_pass]))
+    return np.array(centres), np.array(crossovers).reshape(-1, 3, 2, 6)
+
+
+# Function to compute the combined response of a filter bank with band gains
+def filter_bank_response(crossovers, gains, sample_rate, worN=2000):
+    """Returns (frequencies in Hz, complex response of the weighted bank).
+
+    The worN frequencies are spaced logarithmically from 10 Hz to Nyquist,
+    matching the octave spacing of the bands. The bands are combined as
+    in equalize_blocks.
+    """
+    freq_hz = np.geomspace(10, 0.5 * sample_rate, worN)
+    low = np.ones(worN, dtype=complex)
+    h_total = None
+    for k in range(len(crossovers) - 1, -1, -1):
+        h_low, h_high, h_all = (signal.sosfreqz(sos, worN=freq_hz, fs=sample_rate)[1] for sos in crossovers[k])
+        band = h_high * low
+        low = h_low * low
+        h_total = gains[k + 1] * band if h_total is None else h_all * h_total + gains[k + 1] * band
+    h_total = gains[0] * low if h_total is None else h_total + gains[0] * low
+    return freq_hz, h_total
+
+
+# Function to split a signal into bands, weight them and sum them back, block by block
+def equalize_blocks(crossovers, gains, x, block_size=BLOCK_SIZE, progress=None, dtype=None, out=None):
+    """Returns (equalized signal, mean-square energy of every band of x).
+
+    The bands come from the crossover tree of design_filter_bank(): the
+    highest band is split off first and the rest of the signal goes on
+    to the next crossover down. Before a band is added to the weighted
+    sum of the bands above it, that sum is passed through the band's
+    crossover all-pass, so every band sees the same phase shifts and the
+    bands recombine with a flat magnitude when all gains are one. All
+    filters are causal with their state carried between blocks, as in
+    filter_blocks(zero_phase=False), and no per-band copy of the signal
+    is kept, so memory is bounded by the block size whatever the number
+    of bands. Band energies (before the gains, averaged over channels)
+    are accumulated during the same pass. x, progress, dtype and out are
+    handled as in filter_blocks.
+    """
+    if dtype is None:
+        dtype = x.dtype if np.issubdtype(x.dtype, np.floating) else np.float64
+    n = len(x)
+    y = _output_array(out, x.shape, dtype)
+    energy = np.zeros(len(crossovers) + 1)
+    n_channels = x.shape[1] if x.ndim > 1 else 1
+    # Low- and high-pass halves start settled on x[0]; the all-passes only
+    # see the high bands, which are zero for a constant signal
+    states = []
+    for low, high, all_pass in crossovers:
+        zi = [signal.sosfilt_zi(sos).reshape((len(sos), 2) + (1,) * (x.ndim - 1)) * x[0] for sos in (low, high)]
+        states.append(zi + [np.zeros((len(all_pass), 2) + x.shape[1:])])
+
+    for start in range(0, n, block_size):
+        low_band = np.asarray(x[start:start + block_size], dtype=np.float64)
+        total = None
+        for k in range(len(crossovers) - 1, -1, -1):
+            low, high, all_pass = crossovers[k]
+            band, states[k][1] = signal.sosfilt(high, low_band, axis=0, zi=states[k][1])
+            low_band, states[k][0] = signal.sosfilt(low, low_band, axis=0, zi=states[k][0])
+            energy[k + 1] += np.sum(band ** 2) / n_channels
+            if total is None:
+                total = gains[k + 1] * band
+            else:
+                total, states[k][2] = signal.sosfilt(all_pass, total, axis=0, zi=states[k][2])
+                total += gains[k + 1] * band
+        energy[0] += np.sum(low_band ** 2) / n_channels
+        y[start:start + block_size] = gains[0] * low_band if total is None else total + gains[0] * low_band
+        if progress is not None:
+            progress(min(start + block_size, n) / n)
+    return y, energy / max(n, 1)
+
+
+# Lowest working rate for analysis, relative to the highest displayed frequency
+WORKING_RATE_FACTOR = 2.5
+
+# Stopband attenuation of the anti-alias filters used for analysis, in dB
+ANTIALIAS_ATTENUATION = 60
+
+
+# Function to choose the decimation factor of the analysis path
+def decimation_factor(sample_rate, max_freq):
+    """Returns the largest integer q with sample_rate / q >= 2.5 * max_freq.
+
+    At sample_rate / q the band up to max_freq is kept with a transition
+    band up to the point where aliases would fold back into it.
+    """
+    return max(int(sample_rate // (WORKING_RATE_FACTOR * max_freq)), 1)
+
+
+# Function to design the anti-alias filter for one rate pair
+@functools.lru_cache(maxsize=32)
+def antialias_filter(sample_rate, down):
+    """Returns Kaiser-windowed FIR taps for decimating sample_rate by down.
+
+    The passband reaches 80% and the stopband starts at 120% of the new
+    Nyquist frequency: what lies beyond it can only alias above 80%, which
+    is outside the analysed band. The returned array is shared between
+    callers and must not be modified.
+    """
+    if down == 1:
+        return np.ones(1)
+    nyquist = 0.5 * sample_rate / down
+    numtaps, beta = signal.kaiserord(ANTIALIAS_ATTENUATION, 0.4 * nyquist / (0.5 * sample_rate))
+    return signal.firwin(numtaps | 1, nyquist, window=("kaiser", beta), fs=sample_rate)
+
+
+# Function to decimate a signal block by block with a polyphase filter
+def decimate_blocks(x, down, taps, block_size=BLOCK_SIZE, progress=None, dtype=None):
+    """Returns x filtered with taps and keeping every down-th sample.
+
+    Each block goes through scipy's polyphase upfirdn, which only computes
+    the samples that are kept, together with the last few samples of the
+    previous block so the result does not depend on the block size. The
+    output is the causal filter output, delayed by (len(taps) - 1) / 2
+    input samples, which does not affect spectra. x, progress and dtype
+    are handled as in filter_blocks.
+    """
+    if dtype is None:
+        dtype = x.dtype if np.issubdtype(x.dtype, np.floating) else np.float64
+    n = len(x)
+    block_size = max(block_size // down, 1) * down
+    # History kept in front of each block, a whole number of output samples long
+    history = -(-(len(taps) - 1) // down) * down
+    y = np.empty((-(-n // down),) + x.shape[1:], dtype=dtype)
+
+    previous = np.zeros((history,) + x.shape[1:])
+    for start in range(0, n, block_size):
+        block = np.asarray(x[start:start + block_size])
+        buffer = np.concatenate([previous, block])
+        count = -(-len(block) // down)
+        y[start // down:start // down + count] = signal.upfirdn(taps, buffer, 1, down, axis=0)[history // down:history // down + count]
+        previous = buffer[len(buffer) - history:]
+        if progress is not None:
+            progress(min(start + block_size, n) / n)
+    return y
+
+
+# Segment length used by the averaged (Welch) spectrum
+WELCH_SEGMENT = 4096
+
+
+# Function to compute the magnitude spectrum of a signal up to max_freq
+def magnitude_spectrum(x, sample_rate, max_freq, progress=None):
+    """Returns (frequencies in Hz, |FFT|) for the bins between 0 and max_freq.
+
+    Uses a real-input FFT at the next fast length instead of padding to a
+    power of two, and keeps only the displayed band of the result. The
+    transform is a single step, so progress(1.0) is only reported at the end.
+    For (samples, channels) input the magnitude has one column per channel.
+    """
+    n_fft = sp_fft.next_fast_len(len(x), real=True)
+    n_bins = min(int(max_freq * n_fft / sample_rate) + 1, n_fft // 2 + 1)
+    spectrum = sp_fft.rfft(x, n_fft, axis=0)
+    magnitude = np.abs(spectrum[:n_bins])
+    del spectrum
+    if progress is not None:
+        progress(1.0)
+    return np.arange(n_bins) * (sample_rate / n_fft), magnitude
+
+
+# Function to pick the floating-point dtype that computations on x keep
+def _float_dtype(x):
+    return x.dtype if np.issubdtype(x.dtype, np.floating) else np.dtype(np.float64)
+
+
+# Function to transform windowed segments of a signal a batch at a time
+def _segment_spectra(x, window, hop, n_bins, block_size=BLOCK_SIZE):
+    """Yields (index of the first segment, spectra of a batch of segments).
+
+    Segments are len(window) samples long and start every hop samples;
+    each batch is taken from one block of about block_size samples of x.
+    Spectra have shape (segments, [channels,] n_bins) and are complex64
+    for float32 input (complex128 otherwise).
+    """
+    # A float64 window would promote float32 segments to double precision
+    window = window.astype(_float_dtype(x), copy=False)
+    nperseg = len(window)
+    n_segments = (len(x) - nperseg) // hop + 1
+    per_batch = max(block_size // hop, 1)
+    for first in range(0, n_segments, per_batch):
+        count = min(per_batch, n_segments - first)
+        start = first * hop
+        chunk = np.asarray(x[start:start + (count - 1) * hop + nperseg])
+        segments = np.lib.stride_tricks.sliding_window_view(chunk, nperseg, axis=0)[::hop]
+        yield first, sp_fft.rfft(segments * window, axis=-1)[..., :n_bins]
+
+
+# Function to compute an averaged power spectral density up to max_freq
+def averaged_spectrum(x, sample_rate, max_freq, nperseg=WELCH_SEGMENT, block_size=BLOCK_SIZE, progress=None):
+    """Returns (frequencies in Hz, PSD) using Welch's method.
+
+    Hann-windowed segments with 50% overlap are transformed a batch at a
+    time and their power accumulated, so memory and time per batch depend
+    on the segment length rather than the file length. Matches
+    scipy.signal.welch(x, fs, nperseg=nperseg, detrend=False), and keeps
+    float32 input in single precision.
+    progress(fraction) is called after every batch, as in filter_blocks.
+    For (samples, channels) input the PSD has one column per channel.
+    """
+    nperseg = min(nperseg, len(x))
+    hop = nperseg // 2
+    n_segments = (len(x) - nperseg) // hop + 1
+    window = signal.get_window("hann", nperseg)
+    n_bins = min(int(max_freq * nperseg / sample_rate) + 1, nperseg // 2 + 1)
+
+    # Accumulate power over batches of segments taken from one block of x
+    power = np.zeros(x.shape[1:] + (n_bins,), dtype=_float_dtype(x))
+    for first, spectra in _segment_spectra(x, window, hop, n_bins, block_size):
+        power += np.sum(np.abs(spectra) ** 2, axis=0)
+        if progress is not None:
+            progress((first + len(spectra)) / n_segments)
+
+    # One-sided density scaling, as in scipy.signal.welch
+    psd = np.moveaxis(power, -1, 0) / float(n_segments * sample_rate * np.sum(window ** 2))
+    psd[1:] *= 2
+    if nperseg % 2 == 0 and n_bins == nperseg // 2 + 1:
+        psd[-1] /= 2
+    return np.arange(n_bins) * (sample_rate / nperseg), psd
+
+
+# Function to compute the short-time power spectra of a signal up to max_freq
+def stft_power(x, sample_rate, max_freq, nperseg, hop, out=None, block_size=BLOCK_SIZE, progress=None):
+    """Returns the (frames, bins) power of Hann-windowed frames of x.
+
+    Frame i starts at sample i * hop and covers nperseg samples; bins run
+    from 0 Hz in steps of sample_rate / nperseg up to max_freq. Frames
+    are computed a block at a time as in averaged_spectrum and written
+    into out if given (for example a memory-mapped .npy file from
+    stft_shape), so the whole spectrogram never has to be held in memory.
+    Channels of (samples, channels) input are averaged. progress is
+    handled as in filter_blocks.
+    """
+    shape = stft_shape(len(x), sample_rate, max_freq, nperseg, hop)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    window = signal.get_window("hann", nperseg)
+    for first, spectra in _segment_spectra(x, window, hop, shape[1], block_size):
+        power = np.abs(spectra) ** 2
+        out[first:first + len(power)] = power.mean(axis=1) if power.ndim > 2 else power
+        if progress is not None:
+            progress((first + len(power)) / shape[0])
+    return out
+
+
+# Function to give the shape of the frames computed by stft_power
+def stft_shape(n_samples, sample_rate, max_freq, nperseg, hop):
+    """Returns (number of frames, number of bins) for a signal of n_samples."""
+    n_frames = max((n_samples - nperseg) // hop + 1, 0)
+    return n_frames, min(int(max_freq * nperseg / sample_rate) + 1, nperseg // 2 + 1)
+
+
+# Function to compute the displayed spectrum, optionally at a reduced working rate
+def analysis_spectrum(x, sample_rate, max_freq, welch=False, working_rate=False, progress=None):
+    """Returns (frequencies in Hz, spectrum) up to max_freq.
+
+    The spectrum is averaged_spectrum() if welch is set and
+    magnitude_spectrum() otherwise. With working_rate=True, x is first
+    decimated to the lowest rate that still holds the band up to max_freq
+    (see decimation_factor), so the transform handles several times fewer
+    samples. Magnitudes are scaled by the decimation factor and Welch
+    segments shortened by it, so both stay comparable with the full-rate
+    spectrum.
+    """
+    down = decimation_factor(sample_rate, max_freq) if working_rate else 1
+    spectrum_progress = progress
+    if down > 1:
+        # Decimation is most of the work; the spectrum of the short result is quick
+        decimate_progress = None if progress is None else lambda fraction: progress(0.8 * fraction)
+        x = decimate_blocks(x, down, antialias_filter(sample_rate, down), progress=decimate_progress)
+        spectrum_progress = None if progress is None else lambda fraction: progress(0.8 + 0.2 * fraction)
+    if welch:
+        # Shorter segments keep the frequency resolution of the full-rate spectrum
+        return averaged_spectrum(x, sample_rate / down, max_freq, nperseg=WELCH_SEGMENT // down, progress=spectrum_progress)
+    freq_hz, magnitude = magnitude_spectrum(x, sample_rate / down, max_freq, progress=spectrum_progress)
+    magnitude *= down
+    return freq_hz, magnitude
+
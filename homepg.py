@@ -1,6 +1,6 @@
+import html  # Import html for escaping the team records
 import streamlit as st  # Import Streamlit for web app creation
-import base64  # Import base64 for encoding images
-import os  # Import os to check file paths
+from assets import asset_url  # Import the cached, content-hashed asset URLs
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -9,23 +9,13 @@ st.set_page_config(
     page_icon=" "  # Placeholder for page icon
 )
 
-# Function to encode an image as a Base64 string
-def get_base64_image(image_path):
-    """Encodes an image file to Base64 format."""
-    try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    except Exception as e:
-        st.error(f"Error encoding image: {e}")
-        return None
-
-# Paths to logo and banner images
+# Path to the logo image
 logo_path = "static/fcritlogo.png"  # Ensure this path is correct
-banner_path = "Media/Website_Banner.jpeg"  # Ensure this path is correct
 
-# Encode images in Base64
-logo_base64 = get_base64_image(logo_path)
-banner_base64 = get_base64_image(banner_path)
+# Static URL of the logo; the file is only re-read when it changes on disk
+logo_url = asset_url(logo_path)
+if logo_url is None:
+    st.error(f"Logo image not found: {logo_path}")
 
 # Inject custom CSS for header styling
 st.markdown(
@@ -112,7 +102,7 @@ st.markdown(
             <p>(An Autonomous Institute & Permanently Affiliated To University Of Mumbai)</p>
         </div>
         <div class="logo-container">
-            <img src="data:image/png;base64,{logo_base64}" alt="Institute Logo">
+            <img src="{logo_url}" alt="Institute Logo">
         </div>
     </div>
     """,
@@ -180,361 +170,117 @@ st.header("</> Developers Team", divider="blue")
 
 st.header("")
 
-linkedin_pranali = "https://www.linkedin.com/in/pranali-choudhari-89aa4215/"
-email_pranali = "mailto:pranali.choudhari@fcrit.ac.in"
-linkedin_sarvesh = "https://www.linkedin.com/in/sarvesh-vengurlekar-"
-email_sarvesh = "mailto:sarveshvengurlekarwork@gmail.com"
-linkedin_keziah = "https://www.linkedin.com/in/keziah-vinod-948a32340"
-email_keziah = "mailto:keziahvinod2004@gmail.com"
-linkedin_riya = "https://www.linkedin.com/in/riya-parab-455118241/"
-email_riya = "mailto:riyaramchandraparab@gmail.com"
-linkedin_aaditi = "https://www.linkedin.com/in/aaditi-narvekar-5128a2341/"
-email_aaditi = "mailto:aaditinarvekar1001@gmail.com"
-
-
-# UI Design
-col1, col2, col3 = st.columns(3)
-
-with col2:
-    with st.container():
-        st.markdown(
-            f"""
-        <style>
-            .profile-card {{
-                text-align: center;
-                background: #0069FF;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
-                display: inline-block;
-            }}
-            .name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-top: 10px;
-                color: white;
-            }}
-            .title {{
-                font-size: 16px;
-                color: white;
-                margin-top: 5px;
-            }}
-            .button-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                margin-top: 10px;
-            }}
-            .button {{
-                background-color: white;
-                border: none;
-                padding: 10px 15px;
-                text-align: center;
-                font-size: 16px;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                margin: 5px;
-                display: inline-flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .linkedin-button {{
-                color: black;
-            }}
-            .icon {{
-                width: 20px;
-                height: 20px;
-            }}
-        </style>
-        <div class="profile-card">
-            <div class="name">Dr. Pranali Choudhari</div>
-            <div class="title">Mentor</div>
-                <a href="{linkedin_pranali}" target="_blank" class="button linkedin-button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
-                </a>
-                <a href="{email_pranali}" class="button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
-                </a>
-            </div>
-        </div>
-              """,
-        unsafe_allow_html=True)
+# Team members shown on the page, one card each, grouped into rows by title
+team = [
+    {
+        "name": "Dr. Pranali Choudhari",
+        "title": "Mentor",
+        "linkedin": "https://www.linkedin.com/in/pranali-choudhari-89aa4215/",
+        "email": "pranali.choudhari@fcrit.ac.in",
+    },
+    {
+        "name": "Sarvesh Udaykumar Vengurlekar",
+        "title": "Developer",
+        "linkedin": "https://www.linkedin.com/in/sarvesh-vengurlekar-",
+        "email": "sarveshvengurlekarwork@gmail.com",
+    },
+    {
+        "name": "Riya Ramchandra Parab",
+        "title": "Developer",
+        "linkedin": "https://www.linkedin.com/in/riya-parab-455118241/",
+        "email": "riyaramchandraparab@gmail.com",
+    },
+    {
+        "name": "Keziah Mariam Vinod",
+        "title": "Developer",
+        "linkedin": "https://www.linkedin.com/in/keziah-vinod-948a32340",
+        "email": "keziahvinod2004@gmail.com",
+    },
+    {
+        "name": "Aaditi Manojkumar Narvekar",
+        "title": "Developer",
+        "linkedin": "https://www.linkedin.com/in/aaditi-narvekar-5128a2341/",
+        "email": "aaditinarvekar1001@gmail.com",
+    },
+]
 
-st.header(" ")
+# Stylesheet shared by all profile cards
+team_css = """
+<style>
+    .team-row {
+        display: flex;
+        flex-wrap: wrap;
+        justify-content: space-around;
+        gap: 20px;
+        margin-bottom: 40px;
+    }
+    .profile-card {
+        text-align: center;
+        background: #00b3ff;
+        padding: 30px;
+        border-radius: 10px;
+        box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
+        display: inline-block;
+    }
+    .name {
+        font-size: 24px;
+        font-weight: bold;
+        margin-top: 10px;
+        color: white;
+    }
+    .title {
+        font-size: 16px;
+        color: white;
+        margin-top: 5px;
+    }
+    .button {
+        background-color: white;
+        border: none;
+        padding: 10px 15px;
+        text-align: center;
+        font-size: 16px;
+        border-radius: 5px;
+        cursor: pointer;
+        text-decoration: none;
+        margin: 5px;
+        display: inline-flex;
+        align-items: center;
+        gap: 10px;
+    }
+    .linkedin-button {
+        color: black;
+    }
+    .icon {
+        width: 20px;
+        height: 20px;
+    }
+</style>
+"""
 
-col1, col2, col3, col4 = st.columns(4)
+# HTML template of one profile card
+card_template = """
+<div class="profile-card">
+    <div class="name">{name}</div>
+    <div class="title">{title}</div>
+    <a href="{linkedin}" target="_blank" class="button linkedin-button">
+        <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
+    </a>
+    <a href="mailto:{email}" class="button">
+        <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
+    </a>
+</div>
+"""
 
-with col1:
-    with st.container():
-        st.markdown(
-            f"""
-        <style>
-            .profile-card {{
-                text-align: center;
-                background: #00b3ff;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
-                display: inline-block;
-            }}
-            .name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-top: 10px;
-                color: white;
-            }}
-            .title {{
-                font-size: 16px;
-                color: white;
-                margin-top: 5px;
-            }}
-            .button-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                margin-top: 10px;
-            }}
-            .button {{
-                background-color: white;
-                border: none;
-                padding: 10px 15px;
-                text-align: center;
-                font-size: 16px;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                margin: 5px;
-                display: inline-flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .linkedin-button {{
-                color: black;
-            }}
-            .icon {{
-                width: 20px;
-                height: 20px;
-            }}
-        </style>
-        <div class="profile-card">
-            <div class="name">Sarvesh Udaykumar Vengurlekar</div>
-            <div class="title">Developer</div>
-                <a href="{linkedin_sarvesh}" target="_blank" class="button linkedin-button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
-                </a>
-                <a href="{email_sarvesh}" class="button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
-                </a>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-        
-    st.header(" ")
-    
-with col3:        
-    with st.container():
-        st.markdown(
-            f"""
-        <style>
-            .profile-card {{
-                text-align: center;
-                background: #00b3ff;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
-                display: inline-block;
-            }}
-            .name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-top: 10px;
-                color: white;
-            }}
-            .title {{
-                font-size: 16px;
-                color: white;
-                margin-top: 5px;
-            }}
-            .button-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                margin-top: 10px;
-            }}
-            .button {{
-                background-color: white;
-                border: none;
-                padding: 10px 15px;
-                text-align: center;
-                font-size: 16px;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                margin: 5px;
-                display: inline-flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .linkedin-button {{
-                color: black;
-            }}
-            .icon {{
-                width: 20px;
-                height: 20px;
-            }}
-        </style>
-        <div class="profile-card">
-            <div class="name">Keziah Mariam Vinod</div>
-            <div class="title">Developer</div>
-                <a href="{linkedin_keziah}" target="_blank" class="button linkedin-button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
-                </a>
-                <a href="{email_keziah}" class="button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
-                </a>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+# Function to render the whole team section as one HTML block, cached across reruns
+@st.cache_data(show_spinner=False)
+def get_team_html(members):
+    """Returns the stylesheet and every card, one row per title in order of appearance."""
+    rows = {}
+    for member in members:
+        card = card_template.format(**{key: html.escape(value, quote=True) for key, value in member.items()})
+        rows.setdefault(member["title"], []).append(card)
+    return team_css + "".join(f'<div class="team-row">{"".join(cards)}</div>' for cards in rows.values())
 
 
-with col2:
-    with st.container():
-        st.markdown(
-            f"""
-        <style>
-            .profile-card {{
-                text-align: center;
-                background: #0069FF;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
-                display: inline-block;
-            }}
-            .name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-top: 10px;
-                color: white;
-            }}
-            .title {{
-                font-size: 16px;
-                color: white;
-                margin-top: 5px;
-            }}
-            .button-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                margin-top: 10px;
-            }}
-            .button {{
-                background-color: white;
-                border: none;
-                padding: 10px 15px;
-                text-align: center;
-                font-size: 16px;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                margin: 5px;
-                display: inline-flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .linkedin-button {{
-                color: black;
-            }}
-            .icon {{
-                width: 20px;
-                height: 20px;
-            }}
-        </style>
-        <div class="profile-card">
-            <div class="name">Riya Ramchandra Parab</div>
-            <div class="title">Developer</div>
-                <a href="{linkedin_riya}" target="_blank" class="button linkedin-button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
-                </a>
-                <a href="{email_riya}" class="button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
-                </a>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-        
-    st.header(" ")
-    
-with col4:        
-    with st.container():
-        st.markdown(
-            f"""
-        <style>
-            .profile-card {{
-                text-align: center;
-                background: #00b3ff;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0px 4px 10px rgba(0, 0, 0, 0.1);
-                display: inline-block;
-            }}
-            .name {{
-                font-size: 24px;
-                font-weight: bold;
-                margin-top: 10px;
-                color: white;
-            }}
-            .title {{
-                font-size: 16px;
-                color: white;
-                margin-top: 5px;
-            }}
-            .button-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                margin-top: 10px;
-            }}
-            .button {{
-                background-color: white;
-                border: none;
-                padding: 10px 15px;
-                text-align: center;
-                font-size: 16px;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                margin: 5px;
-                display: inline-flex;
-                align-items: center;
-                gap: 10px;
-            }}
-            .linkedin-button {{
-                color: black;
-            }}
-            .icon {{
-                width: 20px;
-                height: 20px;
-            }}
-        </style>
-        <div class="profile-card">
-            <div class="name">Aaditi Manojkumar Narvekar</div>
-            <div class="title">Developer</div>
-                <a href="{linkedin_aaditi}" target="_blank" class="button linkedin-button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/c/ca/LinkedIn_logo_initials.png" class="icon">
-                </a>
-                <a href="{email_aaditi}" class="button">
-                    <img src="https://upload.wikimedia.org/wikipedia/commons/4/4e/Gmail_Icon.png" class="icon">
-                </a>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-st.markdown('</div>', unsafe_allow_html=True)
+# UI Design
+st.markdown(get_team_html(team), unsafe_allow_html=True)
@@ -0,0 +1,80 @@
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = None
+
+# Optional JSON-lines file that collects stage metrics from all sessions
+METRICS_FILE = os.environ.get("LAB_METRICS_FILE")
+
+# Trace Python/NumPy allocations per stage (adds noticeable overhead)
+TRACE_ALLOCATIONS = os.environ.get("LAB_METRICS_TRACEMALLOC") == "1"
+if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# Most recent records kept per session, and sessions kept in memory
+MAX_RECORDS = 50
+MAX_SESSIONS = 256
+
+_records = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+# Function to identify the Streamlit session running the current thread
+def current_session_id():
+    ctx = get_script_run_ctx(suppress_warning=True) if get_script_run_ctx else None
+    return ctx.session_id if ctx is not None else "local"
+
+
+# Function to time one stage of the pipeline and record its metrics
+@contextlib.contextmanager
+def stage(name, **sizes):
+    """Records duration, allocations and array sizes of the enclosed block.
+
+    Keyword arguments and keys set on the yielded dict (for example the
+    number of samples or the output's nbytes) are stored with the record.
+    Allocated bytes are only measured when LAB_METRICS_TRACEMALLOC=1, and
+    include allocations made concurrently by other sessions.
+    """
+    record = {"stage": name, "session": current_session_id(), **sizes}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        if tracing:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            record["allocated_bytes"] = peak_bytes - start_bytes
+        record["time"] = time.time()
+        _store(record)
+
+
+# Function to return the latest records for a session
+def recent(session_id=None):
+    with _lock:
+        return list(_records.get(session_id or current_session_id(), ()))
+
+
+def _store(record):
+    with _lock:
+        session_records = _records.pop(record["session"], None)
+        if session_records is None:
+            session_records = collections.deque(maxlen=MAX_RECORDS)
+        session_records.append(record)
+        _records[record["session"]] = session_records
+        while len(_records) > MAX_SESSIONS:
+            _records.popitem(last=False)
+        if METRICS_FILE:
+            with open(METRICS_FILE, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
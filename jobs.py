@@ -0,0 +1,76 @@
+import concurrent.futures
+import os
+import threading
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:
+    add_script_run_ctx = get_script_run_ctx = None
+
+# Upper bound on filtering/analysis jobs running at once across all sessions
+MAX_JOBS = int(os.environ.get("LAB_MAX_JOBS", 2))
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="lab-job")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once it has been cancelled."""
+
+
+class Job:
+    """A function running on the shared job pool, with progress and cancellation.
+
+    The function is called with an extra progress= keyword argument. It
+    should call progress(fraction) between chunks of work; that is where
+    cancellation takes effect, by raising JobCancelled.
+    """
+
+    def __init__(self, fn, args, kwargs, label=""):
+        self.label = label
+        self.progress = 0.0
+        self._cancel_event = threading.Event()
+        # Jobs submitted from a Streamlit script keep its run context, so
+        # st.cache_data and friends behave as they do in the script thread.
+        self._ctx = get_script_run_ctx(suppress_warning=True) if get_script_run_ctx else None
+        self._future = _executor.submit(self._run, fn, args, kwargs)
+
+    def _run(self, fn, args, kwargs):
+        if self._ctx is not None:
+            add_script_run_ctx(threading.current_thread(), self._ctx)
+        return fn(*args, progress=self.update, **kwargs)
+
+    def update(self, fraction):
+        """Records progress and stops the job if it has been cancelled."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(max(fraction, 0.0), 1.0)
+
+    def cancel(self):
+        """Requests cancellation; queued jobs never start."""
+        self._cancel_event.set()
+        self._future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self._future.done()
+
+    def result(self):
+        """Returns the job's result, raising its exception if it failed."""
+        return self._future.result()
+
+
+# Function to run a job on the shared pool
+def submit(fn, *args, label="", **kwargs):
+    """Starts fn(*args, progress=..., **kwargs) on the job pool."""
+    return Job(fn, args, kwargs, label=label)
+
+
+# Function to map a sub-task's progress onto part of a job's progress
+def scale_progress(progress, start, end):
+    """Returns a callback reporting fraction f as start + f * (end - start)."""
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + fraction * (end - start))
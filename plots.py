@@ -0,0 +1,237 @@
+import io
+import numpy as np
+from matplotlib.figure import Figure
+
+# Width of the response figure in pixel columns (10 inches at 100 dpi)
+PLOT_COLUMNS = 1000
+
+# Resolution used when rasterizing figures for the page
+RENDER_DPI = 200
+
+# Lower resolution used for quick previews, which rasterize several times faster
+PREVIEW_DPI = 72
+
+
+# Function to reduce a trace to a per-pixel-column min/max envelope
+def minmax_envelope(x, y, n_columns=PLOT_COLUMNS):
+    """Returns (x, y) with at most 2 * n_columns points.
+
+    The samples are split into n_columns equal runs along the first axis
+    and each run is replaced by its minimum and maximum, so a line plot
+    of the result covers exactly the same pixels as the full trace while
+    matplotlib only has to draw a fixed number of vertices.
+    """
+    n = len(y)
+    if n <= 2 * n_columns:
+        return x, y
+    starts = np.linspace(0, n, n_columns, endpoint=False).astype(int)
+    y_env = np.empty((2 * n_columns,) + y.shape[1:], dtype=y.dtype)
+    y_env[0::2] = np.minimum.reduceat(y, starts, axis=0)
+    y_env[1::2] = np.maximum.reduceat(y, starts, axis=0)
+    ends = np.append(starts[1:], n) - 1
+    x_env = np.empty(2 * n_columns, dtype=np.result_type(x, np.float64))
+    x_env[0::2] = x[starts]
+    x_env[1::2] = x[ends]
+    return x_env, y_env
+
+
+# Height of spectrogram images in pixel rows
+SPECTROGRAM_ROWS = 400
+
+
+# Function to reduce an image to at most n_rows x n_columns by max-pooling
+def downsample_image(image, n_rows, n_columns):
+    """Returns image with runs of rows and columns replaced by their maximum.
+
+    Peaks survive the reduction, so narrow events stay visible, and
+    matplotlib only has to draw about as many cells as there are pixels.
+    """
+    for axis, size in ((0, n_rows), (1, n_columns)):
+        if image.shape[axis] > size:
+            starts = np.linspace(0, image.shape[axis], size, endpoint=False).astype(int)
+            image = np.maximum.reduceat(image, starts, axis=axis)
+    return image
+
+
+# Function to apply the common frequency-axis styling of the response plots
+def _style_axis(ax, title, ylabel, max_freq):
+    ax.set_title(title)
+    ax.set_xlabel("Frequency (Hz)")
+    ax.set_ylabel(ylabel)
+    ax.set_xticks(np.arange(250, max_freq+1, 250))
+    ax.set_xlim(0, max_freq)
+    ax.grid(color='gray', linestyle='--', linewidth=0.5)
+
+
+# Function to plot a mono trace, or overlay one trace per channel
+def _plot_channels(ax, x, y, color):
+    x_env, y_env = minmax_envelope(x, y)
+    if y_env.ndim == 1 or y_env.shape[1] == 1:
+        ax.plot(x_env, y_env.reshape(len(y_env)), color=color)
+        return
+    for channel in range(y_env.shape[1]):
+        ax.plot(x_env, y_env[:, channel], alpha=0.7, label=f"Channel {channel + 1}")
+    ax.legend(loc="upper right")
+
+
+# Function to rasterize a matplotlib figure to PNG bytes
+def figure_png(fig, dpi=RENDER_DPI):
+    """Renders fig to PNG bytes and releases its artists."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+# Function to render the filter response and spectra figure
+def render_response(filter_freq_hz, h, freq_hz, spectrum_original, spectrum_filtered, max_freq, spectrum_label="Magnitude", dpi=RENDER_DPI):
+    """Returns the three-panel response figure as PNG bytes.
+
+    The figure is created without pyplot, so it is never registered with
+    the pyplot figure manager and is freed as soon as it is rendered.
+    Traces are reduced to one min/max pair per pixel column. Spectra with
+    one column per channel are drawn as overlaid, labelled traces.
+    """
+    fig = Figure(figsize=(10, 8), layout="tight")
+    ax1, ax2, ax3 = fig.subplots(3, 1)
+
+    # Filter Frequency Response
+    ax1.plot(*minmax_envelope(filter_freq_hz, 20 * np.log10(abs(h))), 'black')
+    _style_axis(ax1, "Filter Frequency Response", "Gain (dB)", max_freq)
+
+    # FFT of Original Audio
+    _plot_channels(ax2, freq_hz, spectrum_original, 'blue')
+    _style_axis(ax2, "FFT of Original Audio", spectrum_label, max_freq)
+
+    # FFT of Filtered Audio
+    if spectrum_filtered is not None:
+        _plot_channels(ax3, freq_hz, spectrum_filtered, 'red')
+        _style_axis(ax3, "FFT of Filtered Audio", spectrum_label, max_freq)
+
+    return figure_png(fig, dpi)
+
+
+# Function to render the comparison figure of a filter sweep
+def render_sweep(responses, freq_hz, spectrum_original, spectra, labels, max_freq, spectrum_label="Magnitude"):
+    """Returns a two-panel PNG overlaying several filters.
+
+    responses is a list of (frequencies, complex response) pairs and
+    spectra a list of output spectra, both in the order of labels. The top
+    panel overlays the filters' gains; the bottom one overlays each output
+    spectrum on the original's (channels are averaged for readability).
+    """
+    fig = Figure(figsize=(10, 8), layout="tight")
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Filter Frequency Responses
+    for (filter_freq_hz, h), label in zip(responses, labels):
+        with np.errstate(divide="ignore"):
+            ax1.plot(*minmax_envelope(filter_freq_hz, 20 * np.log10(abs(h))), label=label)
+    _style_axis(ax1, "Filter Frequency Responses", "Gain (dB)", max_freq)
+    ax1.set_ylim(bottom=-100)
+    ax1.legend(loc="lower right", fontsize="small")
+
+    # Output Spectra
+    ax2.plot(*minmax_envelope(freq_hz, _mean_channels(spectrum_original)), color='lightgray', label="Original")
+    for spectrum, label in zip(spectra, labels):
+        ax2.plot(*minmax_envelope(freq_hz, _mean_channels(spectrum)), alpha=0.8, label=label)
+    _style_axis(ax2, "FFT of Filtered Audio", spectrum_label, max_freq)
+    ax2.legend(loc="upper right", fontsize="small")
+
+    return figure_png(fig)
+
+
+# Function to render the equalizer figure of a filter bank
+def render_equalizer(centres, gains_db, band_energy, response, freq_hz, spectrum_original, spectrum_output, max_freq, spectrum_label="Magnitude"):
+    """Returns a three-panel PNG for a filter-bank equalizer.
+
+    The panels show the combined response of the weighted bands (with the
+    requested gains marked at the band centres), the energy of every band
+    before and after its gain, and the output spectrum over the original.
+    band_energy is the mean-square energy of each band of the input.
+    """
+    fig = Figure(figsize=(10, 10), layout="tight")
+    ax1, ax2, ax3 = fig.subplots(3, 1)
+
+    # Combined Equalizer Response, on a logarithmic frequency axis
+    filter_freq_hz, h = response
+    with np.errstate(divide="ignore"):
+        ax1.semilogx(filter_freq_hz, 20 * np.log10(abs(h)), 'black')
+    ax1.plot(centres, gains_db, 'o', color='orange', label="Band gains")
+    ax1.set_title("Equalizer Frequency Response")
+    ax1.set_xlabel("Frequency (Hz)")
+    ax1.set_ylabel("Gain (dB)")
+    ax1.set_xlim(centres[0] / 2, centres[-1] * 2)
+    ax1.set_ylim(min(-30, min(gains_db) - 6), max(gains_db) + 6)
+    ax1.grid(color='gray', linestyle='--', linewidth=0.5, which='both')
+    ax1.legend(loc="lower right")
+
+    # Band Energy before and after the gains
+    positions = np.arange(len(centres))
+    with np.errstate(divide="ignore"):
+        energy_db = 10 * np.log10(band_energy)
+    floor = np.floor(np.min(energy_db[np.isfinite(energy_db)], initial=0) / 10) * 10 - 10
+    output_db = energy_db + np.asarray(gains_db)
+    ax2.bar(positions - 0.2, np.maximum(energy_db, floor) - floor, 0.4, bottom=floor, color='blue', label="Original")
+    ax2.bar(positions + 0.2, np.maximum(output_db, floor) - floor, 0.4, bottom=floor, color='red', label="Equalized")
+    ax2.set_xticks(positions, [f"{c:.0f}" if c < 1000 else f"{c / 1000:.3g}k" for c in centres], rotation=90 if len(centres) > 12 else 0)
+    ax2.set_title("Band Energy")
+    ax2.set_xlabel("Band centre (Hz)")
+    ax2.set_ylabel("Energy (dB)")
+    ax2.grid(color='gray', linestyle='--', linewidth=0.5, axis='y')
+    ax2.legend(loc="upper left")
+
+    # FFT of Equalized Audio over the original's
+    ax3.plot(*minmax_envelope(freq_hz, _mean_channels(spectrum_original)), color='lightgray', label="Original")
+    ax3.plot(*minmax_envelope(freq_hz, _mean_channels(spectrum_output)), color='red', alpha=0.8, label="Equalized")
+    _style_axis(ax3, "FFT of Equalized Audio", spectrum_label, max_freq)
+    ax3.legend(loc="upper right")
+
+    return figure_png(fig)
+
+
+# Function to render spectrograms of one or more signals
+def render_spectrogram(panels, sample_rate, nperseg, hop, time_range):
+    """Returns a PNG with one spectrogram per (title, frames) panel.
+
+    frames are (frames, bins) power arrays from stft_power; only those in
+    time_range (start, end in seconds) are read, and they are max-pooled
+    to the figure's pixel resolution before plotting. Power is shown in
+    dB relative to the strongest cell of all panels. ValueError is raised
+    if there are no frames at all.
+    """
+    start, end = time_range
+    images = []
+    for title, frames in panels:
+        if len(frames) == 0:
+            raise ValueError(f"the audio is shorter than one {nperseg}-sample window")
+        # A range at the very end still shows the last frame
+        first = min(max(int((start * sample_rate - nperseg / 2) // hop), 0), len(frames) - 1)
+        last = min(int((end * sample_rate - nperseg / 2) // hop) + 1, len(frames))
+        image = downsample_image(np.asarray(frames[first:max(last, first + 1)]).T, SPECTROGRAM_ROWS, PLOT_COLUMNS)
+        images.append((title, image, frames.shape[1]))
+    with np.errstate(divide="ignore"):
+        reference = max(float(image.max()) for _, image, _ in images) or 1.0
+        images = [(title, 10 * np.log10(image / reference), n_bins) for title, image, n_bins in images]
+
+    fig = Figure(figsize=(10, 4 * len(images)), layout="tight")
+    axes = np.atleast_1d(fig.subplots(len(images), 1))
+    for ax, (title, image_db, n_bins) in zip(axes, images):
+        top_freq = (n_bins - 1) * sample_rate / nperseg
+        mesh = ax.imshow(
+            image_db, origin="lower", aspect="auto", cmap="magma", vmin=-100, vmax=0,
+            extent=(start, end, 0, top_freq), interpolation="nearest",
+        )
+        ax.set_title(title)
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel("Frequency (Hz)")
+        fig.colorbar(mesh, ax=ax, label="Power (dB)")
+
+    return figure_png(fig)
+
+
+# Function to average a (bins, channels) spectrum over its channels
+def _mean_channels(spectrum):
+    return spectrum.mean(axis=1) if spectrum.ndim > 1 else spectrum
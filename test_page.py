@@ -1,10 +1,19 @@
-import streamlit as st
+import hashlib
+import os
 import numpy as np
-import scipy.signal as signal
-import scipy.io.wavfile as wav
-import io
-import base64
-import matplotlib.pyplot as plt
+import streamlit as st
+from concurrent.futures import CancelledError
+import jobs
+from array_store import SessionArrays, session_store
+from audio_io import (
+    CODE_VERSION, PREVIEW_RATE, cached_result, encode_preview, ingest_upload, open_audio, result_cache, stft_frames, write_wav,
+)
+from dsp import (
+    BAND_FRACTIONS, BTYPES, FILTER_FAMILIES, FILTER_ORDER, FIR_TAPS, MAX_FIR_TAPS, analysis_spectrum, design_filter,
+    design_filter_bank, equalize_blocks, filter_bank_response, filter_blocks, filter_response, stack_sos,
+)
+from instrumentation import recent, stage
+from plots import PREVIEW_DPI, render_equalizer, render_response, render_spectrogram, render_sweep
 
 st.set_page_config(
     page_title="Signals & Systems Virtual Lab",
@@ -12,46 +21,339 @@ st.set_page_config(
     page_icon=" "
 )
 
-# Function to convert audio to base64 for browser playback
-def get_audio_base64(audio, sample_rate):
-    buffer = io.BytesIO()
-    wav.write(buffer, sample_rate, (audio * 32767).astype(np.int16))
-    audio_bytes = buffer.getvalue()
-    audio_base64 = base64.b64encode(audio_bytes).decode()
-    return f"data:audio/wav;base64,{audio_base64}"
+# Length of the excerpt filtered on every widget change in live preview mode
+LIVE_PREVIEW_SECONDS = 5
+
+# Function to derive a file-name-safe cache key for results computed from the audio
+def result_key(*parts):
+    # Salted with the code version, so a deploy never serves older results
+    return hashlib.sha256(repr((CODE_VERSION,) + parts).encode()).hexdigest()[:32]
+
+# Function to encode audio for browser playback through the shared result cache
+def get_audio_bytes(content_key, sample_rate, preview, audio):
+    # Raw WAV bytes are served by Streamlit's media endpoint, so unlike a
+    # base64 data URI they are neither inflated nor resent on every rerun.
+    # Encoded files are kept only in the shared result cache on disk and
+    # read back on each use, so no worker holds a set of them in RAM.
+    def write(path):
+        with stage("encode", samples=len(audio), preview=preview, cache_hit=False) as record:
+            if preview:
+                audio_bytes, _ = encode_preview(audio, sample_rate)
+                with open(path, "wb") as wav_file:
+                    wav_file.write(audio_bytes)
+            else:
+                write_wav(path, audio, sample_rate)
+            record["output_bytes"] = os.path.getsize(path)
+
+    path = cached_result(result_cache, result_key(content_key, sample_rate, preview) + ".wav", write)
+    with open(path, "rb") as wav_file:
+        return wav_file.read()
+
+# Function to compute a spectrum once for all sessions through the shared result cache
+def get_spectrum(content_key, x, sample_rate, max_freq, use_welch, working_rate, progress=None, record=None):
+    # A miss clears cache_hit on the calling stage's record, if given
+    def write(path):
+        if record is not None:
+            record["cache_hit"] = False
+        freq_hz, spectrum = analysis_spectrum(x, sample_rate, max_freq, use_welch, working_rate, progress=progress)
+        np.savez(path, freq_hz=freq_hz, spectrum=spectrum)
+
+    name = result_key(content_key, "spectrum", max_freq, use_welch, working_rate) + ".npz"
+    with np.load(cached_result(result_cache, name, write)) as data:
+        return data["freq_hz"], data["spectrum"]
+
+# Function to compute spectra and render the response figure, cached across reruns
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_response_png(audio_key, filter_params, filtered_key, use_welch, working_rate, _audio, _filtered_audio, _progress=None):
+    # The figure only depends on the audio content hash, the filter design
+    # (which determines the coefficients) and the display settings, so
+    # the arrays themselves are excluded from the cache key. filtered_key
+    # names the filtered array; one of another file or filter is refused
+    # before anything is cached under this key.
+    # Figures are also kept in the shared result cache on disk.
+    if filtered_key != (audio_key, filter_params):
+        raise ValueError("The filtered audio does not match the loaded file and filter; apply the filter again.")
+    name = result_key(audio_key, filter_params, use_welch, working_rate, "response") + ".png"
+    path = result_cache.get(name)
+    if path is not None:
+        with stage("render", cache_hit=True) as record:
+            with open(path, "rb") as png_file:
+                png = png_file.read()
+            record["output_bytes"] = len(png)
+        return png
+
+    sample_rate = filter_params[3]
+    filter_freq_hz, h = filter_response(*filter_params)
+
+    # Compute spectra of the displayed band only
+    max_freq = min(5000, 0.5 * sample_rate)
+    with stage("spectrum", samples=len(_audio), welch=use_welch, working_rate=working_rate, cache_hit=True) as record:
+        freq_hz, spectrum_original = get_spectrum(
+            audio_key, _audio, sample_rate, max_freq, use_welch, working_rate,
+            progress=jobs.scale_progress(_progress, 0, 0.5), record=record,
+        )
+        if _filtered_audio is not None:
+            _, spectrum_filtered = get_spectrum(
+                filtered_key, _filtered_audio, sample_rate, max_freq, use_welch, working_rate,
+                progress=jobs.scale_progress(_progress, 0.5, 1), record=record,
+            )
+        else:
+            spectrum_filtered = None
+        record["bins"] = len(freq_hz)
+
+    spectrum_label = "PSD" if use_welch else "Magnitude"
+    with stage("render", points=len(freq_hz), cache_hit=False) as record:
+        png = render_response(filter_freq_hz, h, freq_hz, spectrum_original, spectrum_filtered, max_freq, spectrum_label)
+        record["output_bytes"] = len(png)
+
+    def write(path):
+        with open(path, "wb") as png_file:
+            png_file.write(png)
+
+    cached_result(result_cache, name, write)
+    return png
+
+# Function to filter a short excerpt and render a quick response figure, cached across reruns
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_preview_png(audio_key, filter_params, use_welch, working_rate, _audio):
+    # Only the middle LIVE_PREVIEW_SECONDS of the audio are used, so the
+    # preview takes the same time however long the file is.
+    sample_rate = filter_params[3]
+    n = min(len(_audio), int(LIVE_PREVIEW_SECONDS * sample_rate))
+    start = (len(_audio) - n) // 2
+    excerpt = _audio[start:start + n]
+    filtered_excerpt = filter_blocks(design_filter(*filter_params), excerpt)
+
+    max_freq = min(5000, 0.5 * sample_rate)
+    # Same spectrum type as the full-resolution figure that replaces it
+    freq_hz, spectrum_original = analysis_spectrum(excerpt, sample_rate, max_freq, use_welch, working_rate)
+    _, spectrum_filtered = analysis_spectrum(filtered_excerpt, sample_rate, max_freq, use_welch, working_rate)
+    filter_freq_hz, h = filter_response(*filter_params)
+    spectrum_label = "PSD" if use_welch else "Magnitude"
+    return render_response(filter_freq_hz, h, freq_hz, spectrum_original, spectrum_filtered, max_freq, spectrum_label, dpi=PREVIEW_DPI)
+
+# Function to filter with several designs in one pass and render their comparison, cached across reruns
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_sweep_png(audio_key, sweep_params, use_welch, working_rate, _audio, _progress=None):
+    sample_rate = sweep_params[0][3]
+    sos_stack = stack_sos([design_filter(*params) for params in sweep_params])
+    # The outputs of all filters go to a scratch file rather than memory
+    outputs_path = result_cache.temp_path(".npy")
+    try:
+        with stage("filter", samples=len(_audio), filters=len(sweep_params)) as record:
+            outputs = np.lib.format.open_memmap(outputs_path, mode="w+", dtype=_audio.dtype, shape=(len(sos_stack),) + _audio.shape)
+            filter_blocks(sos_stack, _audio, progress=jobs.scale_progress(_progress, 0, 0.8), out=outputs)
+            record["output_bytes"] = outputs.nbytes
+
+        # Spectra of the original and of every filtered output
+        max_freq = min(5000, 0.5 * sample_rate)
+        with stage("spectrum", samples=len(_audio), welch=use_welch, working_rate=working_rate, filters=len(sweep_params)) as record:
+            freq_hz, spectrum_original = analysis_spectrum(_audio, sample_rate, max_freq, use_welch, working_rate)
+            spectra = []
+            for i, output in enumerate(outputs):
+                spectra.append(analysis_spectrum(output, sample_rate, max_freq, use_welch, working_rate)[1])
+                if _progress is not None:
+                    _progress(0.8 + 0.2 * (i + 1) / len(outputs))
+            record["bins"] = len(freq_hz)
+        del outputs, output
+    finally:
+        os.remove(outputs_path)
+
+    labels = [f"{filter_type} {'-'.join(str(c) for c in cutoffs)} Hz, order {order}" for filter_type, order, cutoffs, _ in sweep_params]
+    responses = [filter_response(*params) for params in sweep_params]
+    spectrum_label = "PSD" if use_welch else "Magnitude"
+    with stage("render", points=len(freq_hz), filters=len(sweep_params)) as record:
+        png = render_sweep(responses, freq_hz, spectrum_original, spectra, labels, max_freq, spectrum_label)
+        record["output_bytes"] = len(png)
+    return png
+
+# Function run on the job pool to filter the loaded audio
+def run_filter(audio_key, audio, filter_params, progress):
+    # Results are shared through the result cache, so settings another
+    # session already applied to the same file are not filtered again
+    with stage("filter", samples=len(audio), dtype=str(audio.dtype)) as record:
+        record["cache_hit"] = True
+
+        def write(path):
+            record["cache_hit"] = False
+            # Long FIR designs take a while, so they are made here rather than in the script
+            filter_type, _, cutoffs, _, family = filter_params
+            with stage("design", filter_type=filter_type, family=family, cutoffs=cutoffs):
+                coefficients = design_filter(*filter_params)
+            # Filtered straight into the cache file, so memory does not grow with the recording
+            filtered = np.lib.format.open_memmap(path, mode="w+", dtype=audio.dtype, shape=audio.shape)
+            filter_blocks(coefficients, audio, progress=progress, out=filtered)
+            filtered.flush()
+
+        filtered_audio = open_audio(cached_result(result_cache, result_key(audio_key, filter_params) + ".npy", write))
+        record["output_bytes"] = filtered_audio.nbytes
+    return audio_key, filter_params, filtered_audio
+
+# Function run on the job pool to produce the response figure
+def run_plot(audio_key, filter_params, filtered_key, use_welch, working_rate, audio, filtered_audio, progress):
+    return get_response_png(audio_key, filter_params, filtered_key, use_welch, working_rate, audio, filtered_audio, _progress=progress)
+
+# Function run on the job pool to filter the full file and plot it for the live preview
+def run_live(audio_key, audio, filter_params, use_welch, working_rate, progress):
+    _, _, filtered_audio = run_filter(audio_key, audio, filter_params, jobs.scale_progress(progress, 0, 0.6))
+    png = get_response_png(audio_key, filter_params, (audio_key, filter_params), use_welch, working_rate, audio, filtered_audio, _progress=jobs.scale_progress(progress, 0.6, 1))
+    return (audio_key, filter_params, use_welch, working_rate), filtered_audio, png
+
+# Function run on the job pool to produce the filter sweep figure
+def run_sweep(audio_key, sweep_params, use_welch, working_rate, audio, progress):
+    return get_sweep_png(audio_key, sweep_params, use_welch, working_rate, audio, _progress=progress)
+
+# Function run on the job pool to equalize the loaded audio and render its figure
+def run_equalizer(audio_key, audio, bands, gains_db, sample_rate, use_welch, working_rate, progress):
+    centres, crossovers = design_filter_bank(BAND_FRACTIONS[bands], sample_rate)
+    gains = 10 ** (np.asarray(gains_db) / 20)
+    with stage("equalize", samples=len(audio), bands=len(centres)) as record:
+        # The output is written straight into the result cache, with the band
+        # energies from the same pass in a small file next to it
+        name = result_key(audio_key, "equalizer", bands, gains_db)
+        audio_path, energy_path = result_cache.get(name + ".npy"), result_cache.get(name + "_bands.npy")
+        record["cache_hit"] = audio_path is not None and energy_path is not None
+        if not record["cache_hit"]:
+            temp_path = result_cache.temp_path(".npy")
+            try:
+                equalized = np.lib.format.open_memmap(temp_path, mode="w+", dtype=audio.dtype, shape=audio.shape)
+                _, band_energy = equalize_blocks(crossovers, gains, audio, progress=jobs.scale_progress(progress, 0, 0.7), out=equalized)
+                equalized.flush()
+                del equalized
+                audio_path = result_cache.add(temp_path, name + ".npy")
+            except Exception:
+                os.remove(temp_path)
+                raise
+            energy_path = cached_result(result_cache, name + "_bands.npy", lambda path: np.save(path, band_energy))
+        equalized, band_energy = open_audio(audio_path), np.load(energy_path)
+        record["output_bytes"] = equalized.nbytes
+
+    max_freq = min(5000, 0.5 * sample_rate)
+    with stage("spectrum", samples=len(audio), welch=use_welch, working_rate=working_rate) as record:
+        freq_hz, spectrum_original = analysis_spectrum(
+            audio, sample_rate, max_freq, use_welch, working_rate, progress=jobs.scale_progress(progress, 0.7, 0.85)
+        )
+        _, spectrum_output = analysis_spectrum(
+            equalized, sample_rate, max_freq, use_welch, working_rate, progress=jobs.scale_progress(progress, 0.85, 1)
+        )
+        record["bins"] = len(freq_hz)
+
+    spectrum_label = "PSD" if use_welch else "Magnitude"
+    response = filter_bank_response(crossovers, gains, sample_rate)
+    with stage("render", points=len(freq_hz), bands=len(centres)) as record:
+        png = render_equalizer(centres, gains_db, band_energy, response, freq_hz, spectrum_original, spectrum_output, max_freq, spectrum_label)
+        record["output_bytes"] = len(png)
+    return audio_key, (bands, gains_db), equalized, png
+
+# Function run on the job pool to render spectrograms of the original and filtered audio
+def run_spectrogram(audio_key, filtered_key, audio, filtered_audio, sample_rate, nperseg, hop, time_range, progress):
+    max_freq = min(5000, 0.5 * sample_rate)
+    with stage("stft", samples=len(audio), window=nperseg, hop=hop) as record:
+        # Frames are cached on disk, so other time ranges reuse them
+        panels = [("Spectrogram of Original Audio", stft_frames(
+            audio_key, audio, sample_rate, max_freq, nperseg, hop, progress=jobs.scale_progress(progress, 0, 0.5)
+        ))]
+        # Frames of the filtered audio are cached under the key of that array,
+        # and only drawn if it was filtered from this audio
+        if filtered_audio is not None and filtered_key is not None and filtered_key[0] == audio_key:
+            panels.append(("Spectrogram of Filtered Audio", stft_frames(
+                result_key(*filtered_key), filtered_audio, sample_rate, max_freq, nperseg, hop,
+                progress=jobs.scale_progress(progress, 0.5, 1),
+            )))
+        record["frames"] = len(panels[0][1])
+    with stage("render", frames=len(panels[0][1])) as record:
+        png = render_spectrogram(panels, sample_rate, nperseg, hop, time_range)
+        record["output_bytes"] = len(png)
+    return png
+
+# Function to show a background job's progress until it finishes
+@st.fragment(run_every=0.5)
+def show_job_progress(name):
+    job = st.session_state[name]
+    if job is None or job.done():
+        # Rerun the whole page so the result is delivered
+        st.rerun()
+    st.progress(job.progress, text=job.label)
+    if st.button("Cancel", key=f"cancel_{name}"):
+        job.cancel()
 
 # Initialize session state variables
-if 'audio' not in st.session_state:
-    st.session_state.audio = None
+if 'arrays' not in st.session_state:
+    # Audio arrays live in a shared store that spills to disk under memory pressure
+    st.session_state.arrays = SessionArrays(session_store)
     st.session_state.sample_rate = None
-    st.session_state.filtered_audio = None
     st.session_state.filter_params = None
+    # (audio_key, filter_params) of the array stored as "filtered_audio"
+    st.session_state.filtered_key = None
+    st.session_state.upload_id = None
+    st.session_state.audio_key = None
+    st.session_state.filter_job = None
+    st.session_state.plot_job = None
+    st.session_state.sweep_job = None
+    st.session_state.equalizer_job = None
+    st.session_state.spectrogram_job = None
+    st.session_state.live_job = None
+    st.session_state.live_request = None
+    st.session_state.live_result = None
+arrays = st.session_state.arrays
 
 # Streamlit app layout
 st.title("Audio Filtering App")
 
 # File uploader
 uploaded_file = st.file_uploader("Upload a WAV file", type=["wav"])
+precision = st.radio(
+    "Processing precision",
+    ["float32", "float64"],
+    horizontal=True,
+    help="float32 halves memory use and bandwidth; float64 matches the original double-precision pipeline",
+)
+preview_playback = st.checkbox("Low-bandwidth playback", help=f"Play a {PREVIEW_RATE // 1000} kHz preview instead of the full-rate audio")
 
 if uploaded_file is not None:
     try:
-        # Read and process audio file
-        sample_rate, audio = wav.read(uploaded_file)
-        if audio.ndim > 1:
-            audio = np.mean(audio, axis=1)
-        audio = audio / np.max(np.abs(audio))
-        st.session_state.audio = audio
-        st.session_state.sample_rate = sample_rate
+        # Decode each upload once; identical files share one cached array
+        if st.session_state.upload_id != (uploaded_file.file_id, precision):
+            # Decoding includes downmixing and normalization, done in the same pass
+            with stage("decode", input_bytes=uploaded_file.size, dtype=precision) as record:
+                content_key, sample_rate, audio = ingest_upload(uploaded_file, precision)
+                record["samples"] = len(audio)
+                record["output_bytes"] = audio.nbytes
+            arrays.put("audio", audio)
+            # Everything derived from the audio is cached per content and precision
+            st.session_state.audio_key = f"{content_key}-{precision}"
+            # A filtered array of the previous upload must never be plotted against this one
+            arrays.put("filtered_audio", None)
+            st.session_state.filter_params = None
+            st.session_state.filtered_key = None
+            st.session_state.sample_rate = sample_rate
+            st.session_state.upload_id = (uploaded_file.file_id, precision)
         st.success("Audio file loaded successfully!")
         
         # Display original audio
-        st.audio(get_audio_base64(audio, sample_rate), format="audio/wav")
+        st.audio(get_audio_bytes(st.session_state.audio_key, st.session_state.sample_rate, preview_playback, arrays.get("audio")), format="audio/wav")
         
     except Exception as e:
         st.error(f"Failed to load audio: {e}")
 
 # Filter selection
 filter_type = st.selectbox("Select Filter Type", ["Low-Pass", "High-Pass", "Band-Pass"])
+filter_family = st.selectbox(
+    "Filter Family",
+    list(FILTER_FAMILIES),
+    help="Butterworth filters are applied forward and backward; linear-phase FIR filters by FFT convolution in a single pass",
+)
+if FILTER_FAMILIES[filter_family] == "butter":
+    filter_order = FILTER_ORDER
+else:
+    filter_order = st.number_input(
+        "Number of taps",
+        min_value=11,
+        max_value=MAX_FIR_TAPS[FILTER_FAMILIES[filter_family]],
+        value=FIR_TAPS,
+        step=2,
+        help="Longer filters have sharper transitions",
+    )
 
 # Cutoff frequency inputs
 nyquist = 0.5 * st.session_state.sample_rate if st.session_state.sample_rate else 22050  # Default Nyquist for error handling
@@ -63,88 +365,341 @@ elif filter_type == "Band-Pass":
     low_cutoff = col1.number_input("Lower Cutoff Frequency (Hz)", min_value=1, max_value=int(nyquist), value=500)
     high_cutoff = col2.number_input("Upper Cutoff Frequency (Hz)", min_value=1, max_value=int(nyquist), value=1500)
 
+use_welch = st.checkbox("Averaged spectrum (Welch)", help="Average short segments instead of one FFT of the whole file")
+working_rate = st.checkbox(
+    "Fast analysis at a reduced rate",
+    help="Decimate to just above the displayed 0-5 kHz band before computing spectra; playback and export stay at full rate",
+)
+
+# Live preview: an excerpt is filtered on every change, the full file in the background
+live_preview = st.checkbox(
+    "Live preview",
+    help=f"Update the response on every change from a {LIVE_PREVIEW_SECONDS} s excerpt; the full-resolution result replaces it when ready",
+)
+
+# Deliver a finished live preview job
+live_job = st.session_state.live_job
+if live_job is not None and live_job.done():
+    st.session_state.live_job = None
+    try:
+        live_request, filtered_audio, png = live_job.result()
+    except (jobs.JobCancelled, CancelledError):
+        pass
+    except ValueError:
+        st.error("Invalid input! Please enter valid numeric cutoff values.")
+    else:
+        if live_request[0] == st.session_state.audio_key:
+            arrays.put("filtered_audio", filtered_audio)
+            st.session_state.filter_params = live_request[1]
+            st.session_state.filtered_key = (live_request[0], live_request[1])
+            st.session_state.live_result = (live_request, png)
+
+if not live_preview:
+    if st.session_state.live_job is not None:
+        st.session_state.live_job.cancel()
+        st.session_state.live_job = None
+    st.session_state.live_request = None
+elif arrays.get("audio") is not None:
+    # Cutoffs must lie strictly below Nyquist, which the inputs allow
+    if filter_type == "Band-Pass":
+        cutoffs = (low_cutoff, high_cutoff) if low_cutoff < high_cutoff < nyquist else None
+    else:
+        cutoffs = (cutoff,) if cutoff < nyquist else None
+
+    if cutoffs is None:
+        if filter_type == "Band-Pass":
+            st.warning(f"Enter valid frequencies (1-{int(nyquist)} Hz) with low < high to preview.")
+        else:
+            st.warning(f"Enter a cutoff below {int(nyquist)} Hz to preview.")
+    else:
+        live_params = (filter_type, filter_order, cutoffs, st.session_state.sample_rate, filter_family)
+        live_request = (st.session_state.audio_key, live_params, use_welch, working_rate)
+        live_result = st.session_state.live_result
+        if live_result is not None and live_result[0] == live_request:
+            st.image(live_result[1])
+            filtered_key = (st.session_state.audio_key, live_params)
+            st.audio(get_audio_bytes(filtered_key, st.session_state.sample_rate, preview_playback, arrays.get("filtered_audio")), format="audio/wav")
+        else:
+            try:
+                with stage("preview", filter_type=filter_type, cutoffs=cutoffs) as record:
+                    png = get_preview_png(st.session_state.audio_key, live_params, use_welch, working_rate, arrays.get("audio"))
+                    record["output_bytes"] = len(png)
+            except ValueError:
+                st.error("Invalid input! Please enter valid numeric cutoff values.")
+                png = None
+            if png is not None:
+                st.image(png, caption=f"Preview from a {LIVE_PREVIEW_SECONDS} s excerpt")
+
+            # Filter the full file for the latest settings only
+            if png is not None and st.session_state.live_request != live_request:
+                if st.session_state.live_job is not None:
+                    st.session_state.live_job.cancel()
+                st.session_state.live_job = jobs.submit(
+                    run_live,
+                    st.session_state.audio_key,
+                    arrays.get("audio"),
+                    live_params,
+                    use_welch,
+                    working_rate,
+                    label="Computing full-resolution result...",
+                )
+                st.session_state.live_request = live_request
+
+    if st.session_state.live_job is not None:
+        show_job_progress("live_job")
+
+# Deliver a finished filtering job into session state
+filter_job = st.session_state.filter_job
+if filter_job is not None and filter_job.done():
+    st.session_state.filter_job = None
+    try:
+        audio_key, filter_params, filtered_audio = filter_job.result()
+    except (jobs.JobCancelled, CancelledError):
+        st.warning("Filtering cancelled.")
+    except ValueError:
+        st.error("Invalid input! Please enter valid numeric cutoff values.")
+    else:
+        if audio_key == st.session_state.audio_key:
+            arrays.put("filtered_audio", filtered_audio)
+            st.session_state.filter_params = filter_params
+            st.session_state.filtered_key = (audio_key, filter_params)
+            st.success("Filter applied! You can now play the filtered audio or plot the response.")
+
+            # Display filtered audio
+            filtered_key = (audio_key, filter_params)
+            st.audio(get_audio_bytes(filtered_key, st.session_state.sample_rate, preview_playback, filtered_audio), format="audio/wav")
+
 # Apply filter button
 if st.button("Apply Filter"):
-    if st.session_state.audio is None:
+    if arrays.get("audio") is None:
         st.error("No audio file loaded!")
     else:
         try:
-            if filter_type == "Low-Pass":
-                normal_cutoff = cutoff / nyquist
-                b, a = signal.butter(6, normal_cutoff, btype='low', analog=False)
-            elif filter_type == "High-Pass":
-                normal_cutoff = cutoff / nyquist
-                b, a = signal.butter(6, normal_cutoff, btype='high', analog=False)
+            if filter_type in ["Low-Pass", "High-Pass"]:
+                cutoffs = (cutoff,)
             elif filter_type == "Band-Pass":
                 if low_cutoff >= high_cutoff or low_cutoff <= 0 or high_cutoff >= nyquist:
                     st.error(f"Enter valid frequencies (1-{int(nyquist)} Hz) with low < high.")
+                    cutoffs = None
                 else:
-                    normal_cutoff = [low_cutoff / nyquist, high_cutoff / nyquist]
-                    b, a = signal.butter(6, normal_cutoff, btype='band', analog=False)
-            
-            # Apply filter
-            st.session_state.filtered_audio = signal.filtfilt(b, a, st.session_state.audio)
-            st.session_state.filter_params = (b, a)
-            st.success("Filter applied! You can now play the filtered audio or plot the response.")
-            
-            # Display filtered audio
-            st.audio(get_audio_base64(st.session_state.filtered_audio, st.session_state.sample_rate), format="audio/wav")
-            
+                    cutoffs = (low_cutoff, high_cutoff)
+
+            if cutoffs is not None:
+                # Design (or reuse) the filter and filter in the background
+                filter_params = (filter_type, filter_order, cutoffs, st.session_state.sample_rate, filter_family)
+                if st.session_state.filter_job is not None:
+                    st.session_state.filter_job.cancel()
+                st.session_state.filter_job = jobs.submit(
+                    run_filter, st.session_state.audio_key, arrays.get("audio"), filter_params, label="Filtering..."
+                )
+
         except ValueError:
             st.error("Invalid input! Please enter valid numeric cutoff values.")
 
+if st.session_state.filter_job is not None:
+    show_job_progress("filter_job")
+
+# Deliver a finished plotting job
+plot_job = st.session_state.plot_job
+if plot_job is not None and plot_job.done():
+    st.session_state.plot_job = None
+    try:
+        st.image(plot_job.result())
+    except (jobs.JobCancelled, CancelledError):
+        st.warning("Plotting cancelled.")
+    except ValueError as e:
+        st.error(str(e))
+
 # Plot response button
 if st.button("Plot Response"):
-    if st.session_state.filter_params is None:
+    # The filtered array must belong to the loaded audio and the current filter,
+    # since the figure is cached for everyone under that key
+    if st.session_state.filter_params is None or st.session_state.filtered_key != (st.session_state.audio_key, st.session_state.filter_params):
         st.error("Apply a filter first to plot the response!")
     else:
-        b, a = st.session_state.filter_params
-        nyquist = 0.5 * st.session_state.sample_rate
-        w, h = signal.freqz(b, a, worN=2000)
-
-        # Compute FFT
-        N = len(st.session_state.audio)
-        N_fft = 2**np.ceil(np.log2(N)).astype(int)
-        freqs = np.fft.fftfreq(N_fft, d=1/st.session_state.sample_rate)
-        fft_original = np.fft.fft(st.session_state.audio, N_fft)
-        fft_filtered = np.fft.fft(st.session_state.filtered_audio, N_fft) if st.session_state.filtered_audio is not None else None
-
-        # Set x-axis range
-        max_freq = min(5000, nyquist)
-        mask = (freqs >= 0) & (freqs <= max_freq)
-        freq_hz = freqs[mask]
-        filter_freq_hz = (w * nyquist / np.pi)
-
-        # Create plots
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
-
-        # Filter Frequency Response
-        ax1.plot(filter_freq_hz, 20 * np.log10(abs(h)), 'black')
-        ax1.set_title("Filter Frequency Response")
-        ax1.set_xlabel("Frequency (Hz)")
-        ax1.set_ylabel("Gain (dB)")
-        ax1.set_xticks(np.arange(250, max_freq+1, 250))
-        ax1.set_xlim(0, max_freq)
-        ax1.grid(color='gray', linestyle='--', linewidth=0.5)
-
-        # FFT of Original Audio
-        ax2.plot(freq_hz, np.abs(fft_original[mask]), color='blue')
-        ax2.set_title("FFT of Original Audio")
-        ax2.set_xlabel("Frequency (Hz)")
-        ax2.set_ylabel("Magnitude")
-        ax2.set_xticks(np.arange(250, max_freq+1, 250))
-        ax2.set_xlim(0, max_freq)
-        ax2.grid(color='gray', linestyle='--', linewidth=0.5)
-
-        # FFT of Filtered Audio
-        if fft_filtered is not None:
-            ax3.plot(freq_hz, np.abs(fft_filtered[mask]), color='red')
-            ax3.set_title("FFT of Filtered Audio")
-            ax3.set_xlabel("Frequency (Hz)")
-            ax3.set_ylabel("Magnitude")
-            ax3.set_xticks(np.arange(250, max_freq+1, 250))
-            ax3.set_xlim(0, max_freq)
-            ax3.grid(color='gray', linestyle='--', linewidth=0.5)
-
-        plt.tight_layout()
-        st.pyplot(fig)
+        if st.session_state.plot_job is not None:
+            st.session_state.plot_job.cancel()
+        st.session_state.plot_job = jobs.submit(
+            run_plot,
+            st.session_state.audio_key,
+            st.session_state.filter_params,
+            st.session_state.filtered_key,
+            use_welch,
+            working_rate,
+            arrays.get("audio"),
+            arrays.get("filtered_audio"),
+            label="Computing spectra...",
+        )
+
+if st.session_state.plot_job is not None:
+    show_job_progress("plot_job")
+
+# Filter sweep: several designs applied in one pass and compared in one figure
+with st.expander("Filter sweep (compare several filters)"):
+    sweep_table = st.data_editor(
+        [
+            {"Filter Type": "Low-Pass", "Cutoff (Hz)": 500, "Upper Cutoff (Hz)": None, "Order": FILTER_ORDER},
+            {"Filter Type": "Low-Pass", "Cutoff (Hz)": 1000, "Upper Cutoff (Hz)": None, "Order": FILTER_ORDER},
+            {"Filter Type": "Band-Pass", "Cutoff (Hz)": 500, "Upper Cutoff (Hz)": 1500, "Order": FILTER_ORDER},
+        ],
+        column_config={
+            "Filter Type": st.column_config.SelectboxColumn(options=list(BTYPES), required=True),
+            "Cutoff (Hz)": st.column_config.NumberColumn(min_value=1, max_value=int(nyquist), required=True),
+            "Upper Cutoff (Hz)": st.column_config.NumberColumn(min_value=1, max_value=int(nyquist), help="Band-Pass only"),
+            "Order": st.column_config.NumberColumn(min_value=1, max_value=12, step=1, required=True),
+        },
+        num_rows="dynamic",
+        key="sweep_table",
+    )
+
+    # Deliver a finished sweep job
+    sweep_job = st.session_state.sweep_job
+    if sweep_job is not None and sweep_job.done():
+        st.session_state.sweep_job = None
+        try:
+            st.image(sweep_job.result())
+        except (jobs.JobCancelled, CancelledError):
+            st.warning("Sweep cancelled.")
+        except ValueError:
+            st.error("Invalid input! Please enter valid numeric cutoff values.")
+
+    if st.button("Run Sweep"):
+        sweep_params = []
+        for row in sweep_table:
+            if row["Filter Type"] == "Band-Pass":
+                cutoffs = (row["Cutoff (Hz)"], row["Upper Cutoff (Hz)"])
+                if cutoffs[1] is None or cutoffs[0] >= cutoffs[1] or cutoffs[1] >= nyquist:
+                    st.error(f"Band-Pass rows need valid frequencies (1-{int(nyquist)} Hz) with low < high.")
+                    sweep_params = None
+                    break
+            else:
+                cutoffs = (row["Cutoff (Hz)"],)
+            sweep_params.append((row["Filter Type"], int(row["Order"]), cutoffs, st.session_state.sample_rate))
+
+        if arrays.get("audio") is None:
+            st.error("No audio file loaded!")
+        elif sweep_params is not None and not sweep_params:
+            st.error("Add at least one filter to the sweep.")
+        elif sweep_params:
+            if st.session_state.sweep_job is not None:
+                st.session_state.sweep_job.cancel()
+            st.session_state.sweep_job = jobs.submit(
+                run_sweep,
+                st.session_state.audio_key,
+                tuple(sweep_params),
+                use_welch,
+                working_rate,
+                arrays.get("audio"),
+                label="Running sweep...",
+            )
+
+    if st.session_state.sweep_job is not None:
+        show_job_progress("sweep_job")
+
+# Equalizer: octave or third-octave filter bank with a gain per band
+with st.expander("Equalizer (filter bank)"):
+    bands = st.radio("Bands", list(BAND_FRACTIONS), horizontal=True)
+    eq_rate = st.session_state.sample_rate or 44100
+    centres, _ = design_filter_bank(BAND_FRACTIONS[bands], eq_rate)
+    eq_table = st.data_editor(
+        [{"Band (Hz)": round(c), "Gain (dB)": 0.0} for c in centres],
+        column_config={
+            "Band (Hz)": st.column_config.NumberColumn(disabled=True),
+            "Gain (dB)": st.column_config.NumberColumn(min_value=-24.0, max_value=12.0, step=0.5, required=True),
+        },
+        hide_index=True,
+        key=f"eq_table_{bands}_{eq_rate}",
+    )
+
+    # Deliver a finished equalizer job
+    equalizer_job = st.session_state.equalizer_job
+    if equalizer_job is not None and equalizer_job.done():
+        st.session_state.equalizer_job = None
+        try:
+            audio_key, eq_settings, equalized_audio, png = equalizer_job.result()
+        except (jobs.JobCancelled, CancelledError):
+            st.warning("Equalizer cancelled.")
+        else:
+            if audio_key == st.session_state.audio_key:
+                arrays.put("equalized_audio", equalized_audio)
+                st.image(png)
+                equalized_key = (audio_key, "equalizer", eq_settings)
+                st.audio(get_audio_bytes(equalized_key, st.session_state.sample_rate, preview_playback, equalized_audio), format="audio/wav")
+
+    if st.button("Apply Equalizer"):
+        if arrays.get("audio") is None:
+            st.error("No audio file loaded!")
+        else:
+            if st.session_state.equalizer_job is not None:
+                st.session_state.equalizer_job.cancel()
+            st.session_state.equalizer_job = jobs.submit(
+                run_equalizer,
+                st.session_state.audio_key,
+                arrays.get("audio"),
+                bands,
+                tuple(float(row["Gain (dB)"]) for row in eq_table),
+                st.session_state.sample_rate,
+                use_welch,
+                working_rate,
+                label="Equalizing...",
+            )
+
+    if st.session_state.equalizer_job is not None:
+        show_job_progress("equalizer_job")
+
+# Spectrogram: time-varying content of the original and filtered audio
+with st.expander("Spectrogram"):
+    col1, col2 = st.columns(2)
+    nperseg = col1.selectbox("Window length (samples)", [256, 512, 1024, 2048, 4096], index=2)
+    overlap = col2.selectbox("Overlap", ["50%", "75%"])
+    hop = nperseg // 2 if overlap == "50%" else nperseg // 4
+    duration = len(arrays.get("audio")) / st.session_state.sample_rate if arrays.get("audio") is not None else 0.0
+    if duration > 0:
+        time_range = st.slider("Time range (s)", 0.0, duration, (0.0, duration))
+    else:
+        time_range = (0.0, 0.0)
+
+    # Deliver a finished spectrogram job
+    spectrogram_job = st.session_state.spectrogram_job
+    if spectrogram_job is not None and spectrogram_job.done():
+        st.session_state.spectrogram_job = None
+        try:
+            st.image(spectrogram_job.result())
+        except (jobs.JobCancelled, CancelledError):
+            st.warning("Spectrogram cancelled.")
+        except ValueError as e:
+            st.error(f"Failed to compute the spectrogram: {e}")
+
+    if st.button("Show Spectrogram"):
+        if arrays.get("audio") is None:
+            st.error("No audio file loaded!")
+        elif len(arrays.get("audio")) < nperseg:
+            st.error(f"The audio is shorter than one {nperseg}-sample window; choose a shorter window.")
+        elif time_range[1] <= time_range[0]:
+            st.error("Select a time range longer than zero.")
+        else:
+            if st.session_state.spectrogram_job is not None:
+                st.session_state.spectrogram_job.cancel()
+            st.session_state.spectrogram_job = jobs.submit(
+                run_spectrogram,
+                st.session_state.audio_key,
+                st.session_state.filtered_key,
+                arrays.get("audio"),
+                arrays.get("filtered_audio"),
+                st.session_state.sample_rate,
+                nperseg,
+                hop,
+                time_range,
+                label="Computing spectrogram...",
+            )
+
+    if st.session_state.spectrogram_job is not None:
+        show_job_progress("spectrogram_job")
+
+# Per-stage timings of this session, for diagnosing slow runs
+with st.expander("Performance details"):
+    records = recent()
+    if records:
+        st.dataframe(records[::-1], hide_index=True)
+    else:
+        st.caption("No stages recorded yet.")